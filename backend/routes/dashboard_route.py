@@ -1,5 +1,8 @@
 from flask import Blueprint, render_template, session, redirect, url_for, flash, jsonify
 from backend import db
+from backend.services.http_cache import make_etag, not_modified, json_response, plan_list_version
+from backend.services.activity import user_progress, dashboard_progress
+from backend.services.queries import first_id
 from google.cloud.firestore_v1.base_query import FieldFilter
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -27,36 +30,39 @@ def get_dashboard_data():
         # 1. Fetch user's name
         name = session.get('name', 'User')
 
-        # 2. Get total plan count
-        plans_query = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id))
-        plan_count = len(list(plans_query.stream()))
+        # XP, streak, level and completed topics: one counters document kept up to date by the activity ledger
+        progress = dashboard_progress(user_progress(user_id))
 
-        # 3. Get total count of completed topics
-        # Note: Your original code had a potential issue with 'userId' on lessons, assuming it should be linked via plans/modules.
-        # This is a simplified query. For a real app, you would query lessons based on the user's plans.
-        completed_topics_count = 0 # Placeholder until lesson schema is confirmed to have userId
+        # 2. Plan count (a count() aggregation) and newest change, which also version the response
+        plan_count, plans_updated_at = plan_list_version(user_id)
+
+        # Unchanged plans, name and counters: answer 304 before running the dashboard queries
+        etag = make_etag('dashboard', user_id, name, plan_count, plans_updated_at, *progress.values())
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        # 3. Total count of completed topics comes from the progress counters
+        completed_topics_count = progress['completed_topics_count']
         
         # 4. Find the most recently created plan for the "Continue Learning" button
-        last_plan_id = None
-        latest_plan_query = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id)).order_by('creation_date', direction='DESCENDING').limit(1)
-        last_plan_docs = list(latest_plan_query.stream())
-        if last_plan_docs:
-            last_plan_id = last_plan_docs[0].id
+        latest_plan_query = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id)).order_by('creation_date', direction='DESCENDING')
+        last_plan_id = first_id(latest_plan_query)
 
         # 5. Package all data into a JSON response
-        return jsonify({
+        return json_response({
             'status': 'success',
             'data': {
                 'name': name,
                 'plan_count': plan_count,
                 'completed_topics_count': completed_topics_count,
                 'last_plan_id': last_plan_id,
-                # Placeholder data from your HTML, can be made dynamic later
-                'xp_points': 1250,
-                'day_streak': 7,
-                'level': 3
+                'xp_points': progress['xp_points'],
+                'day_streak': progress['day_streak'],
+                'longest_streak': progress['longest_streak'],
+                'level': progress['level']
             }
-        }), 200
+        }, etag)
 
     except Exception as e:
         print(f"API Dashboard Error: {e}")
@@ -2,6 +2,9 @@
 
 from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
 from backend import db
+from backend.services.cascade_delete import submit_all_plans_deletion, request_account_deletion
+from backend.services.job_queue import QueueFullError
+from backend.routes.my_courses_route import delete_job_response, delete_queue_full_response
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -41,32 +44,11 @@ def delete_all_plans():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        user_id = session['user_id']
-        # This is a more robust way to delete all associated data
-        # Note: For very large datasets, this should be a background job
-        plans_query = db.collection('plans').where('userId', '==', user_id).stream()
-        plan_ids = [plan.id for plan in plans_query]
-
-        if not plan_ids:
-            return jsonify({'status': 'success', 'message': 'No plans to delete.'})
-
-        # Find all modules related to these plans
-        modules_query = db.collection('modules').where('planId', 'in', plan_ids).stream()
-        module_ids = [module.id for module in modules_query]
-
-        # Find all lessons related to these modules
-        if module_ids:
-            lessons_query = db.collection('lessons').where('moduleId', 'in', module_ids).stream()
-            for lesson in lessons_query:
-                lesson.reference.delete()
-
-        # Delete modules and plans
-        for module_id in module_ids:
-            db.collection('modules').document(module_id).delete()
-        for plan_id in plan_ids:
-            db.collection('plans').document(plan_id).delete()
-            
-        return jsonify({'status': 'success', 'message': 'All plans and associated data have been deleted.'})
+        # Modules, lessons and notes of every plan go in a background job
+        job_id = submit_all_plans_deletion(session['user_id'])
+        return delete_job_response(job_id, 'Deleting all plans and associated data.')
+    except QueueFullError:
+        return delete_queue_full_response()
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -76,13 +58,15 @@ def delete_account():
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        user_id = session['user_id']
-        # First, delete all plans associated with the user
-        delete_all_plans() 
-        # Then, delete the user document itself
-        db.collection('users').document(user_id).delete()
-        
+        # Marks the user as pending deletion and queues removal of everything they own
+        # (plans, notes, quiz history, progress); the user document is deleted last.
+        request_account_deletion(session['user_id'])
+
+        # No job id: the session is cleared, so the owner could never poll it.
         session.clear() # Log the user out
-        return jsonify({'status': 'success', 'message': 'Account deleted successfully.'})
+        return jsonify({
+            'status': 'success',
+            'message': 'Your account is being deleted. You have been logged out and your data will be removed shortly.'
+        }), 202
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
\ No newline at end of file
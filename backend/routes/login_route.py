@@ -68,8 +68,8 @@ def login():
             user_doc = user_docs[0]
             user_data = user_doc.to_dict()
             
-            # Check password
-            if not check_password_hash(user_data.get('password_hash', ''), auth_value):
+            # Check password (accounts being deleted can't log in any more)
+            if user_data.get('deletion_pending') or not check_password_hash(user_data.get('password_hash', ''), auth_value):
                 logger.warning(f"Password mismatch for user: {user_doc.id}")
                 if request.is_json:
                     return jsonify({'status': 'error', 'message': 'Invalid credentials. Please try again.'}), 401
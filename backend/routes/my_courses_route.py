@@ -1,65 +1,65 @@
 from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
 from backend import db
+from backend.services.prefetch import prefetcher
+from backend.services.youtube_client import search_videos, search_videos_batch, lesson_search_query, embed_url
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.transcript_store import open_transcript, open_stored_transcript, video_id_from_url
+from backend.services.plan_progress import set_lesson_completion, PlanNotFoundError
+from backend.services.course_view_cache import course_view_cache
+from backend.services.http_cache import make_etag, not_modified, json_response, plan_version, plan_list_version
+from backend.services.pagination import fetch_page, page_size_from, InvalidCursorError
+from backend.services.quiz_aggregates import record_quiz_attempt, top_scores, user_quiz_stats
+from backend.services.lesson_lookup import lesson_topics
+from backend.services.activity import record_lesson_completion, record_quiz_submission
+from backend.services.queries import project, first_id
+from backend.services.cascade_delete import delete_jobs, submit_plan_deletion, PLAN_FIELDS
+from backend.services.job_queue import QueueFullError, JOB_DONE, JOB_FAILED
 from google.cloud.firestore_v1.base_query import FieldFilter
 from firebase_admin import firestore
-import requests
+import math
+import threading
 import os
 import re
 
 # --- Imports for Data Science & New Features ---
-# --- Imports for Data Science & New Features ---
-# from sentence_transformers import SentenceTransformer
-# from sklearn.metrics.pairwise import cosine_similarity
+# Video ranking uses the built-in NumPy embedder instead of sentence-transformers/scikit-learn
+from backend.services.text_vectors import HashingEmbedder
+# Quizzes from transcripts use a local TF-IDF cloze generator instead of spaCy
+from backend.services.local_quiz import generate_cloze_quiz
 
-from youtube_transcript_api import YouTubeTranscriptApi
-# import spacy
-import random
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # --- Load the NLP models once when the server starts ---
 print("Loading NLP models...")
-# video_search_model = SentenceTransformer('all-MiniLM-L6-v2')
-video_search_model = None # Placeholder
-# quiz_model = spacy.load("en_core_web_md")
-quiz_model = None # Placeholder
+video_search_model = HashingEmbedder() # No model files: hashed words + char n-grams with SIF weighting
 print("NLP models loaded.")
 
 my_courses_bp = Blueprint('my_courses', __name__)
 
 # ----------------------------- HELPER FUNCTIONS -----------------------------
 
-def get_semantically_best_video(lesson: dict) -> str:
-    """Finds the most semantically relevant YouTube video for a given lesson."""
-    YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
-    if not YOUTUBE_API_KEY:
+# Lesson fields needed to find (and store) a lesson's video.
+VIDEO_LESSON_FIELDS = ['topic', 'description', 'youtube_link', 'planId']
+
+def pick_best_video(lesson: dict, candidates: list) -> str:
+    """Chooses the candidate video for a lesson and returns its embed URL."""
+    if not candidates:
         return ""
 
-    search_query = f"{lesson.get('topic', '')} tutorial"
+    # Re-rank the search results semantically against the lesson text (one vectorized pass)
     lesson_text = f"{lesson.get('topic', '')}: {lesson.get('description', '')}"
+    video_texts = [f"{item['title']}: {item['description']}" for item in candidates]
+    similarities = video_search_model.score(lesson_text, video_texts)
+    best_video_id = candidates[int(similarities.argmax())]['video_id']
 
-    try:
-        search_url = f"https://www.googleapis.com/youtube/v3/search?part=snippet&q={search_query}&type=video&maxResults=5&key={YOUTUBE_API_KEY}"
-        response = requests.get(search_url)
-        response.raise_for_status()
-        search_results = response.json().get('items', [])
-        if not search_results:
-            return ""
-
-        # Use the first result as default since semantic search is disabled on deployment
-        best_video_id = search_results[0]['id']['videoId']
-        
-        # --- Semantic logic disabled for deployment compatibility ---
-        # if video_search_model:
-        #     lesson_embedding = video_search_model.encode([lesson_text])
-        #     video_texts = [f"{item['snippet']['title']}: {item['snippet']['description']}" for item in search_results]
-        #     video_embeddings = video_search_model.encode(video_texts)
-        #     similarities = cosine_similarity(lesson_embedding, video_embeddings)[0]
-        #     best_match_index = similarities.argmax()
-        #     best_video_id = search_results[best_match_index]['id']['videoId']
-        
-        # Return an embeddable URL
+    # Return an embeddable URL
+    return embed_url(best_video_id)
 
-        return f"https://www.youtube.com/embed/{best_video_id}"
 
+def get_semantically_best_video(lesson: dict) -> str:
+    """Finds the most semantically relevant YouTube video for a given lesson."""
+    try:
+        return pick_best_video(lesson, search_videos(lesson_search_query(lesson)))
     except Exception as e:
         print(f"Semantic video search error: {e}")
         return ""
@@ -67,57 +67,108 @@ def get_semantically_best_video(lesson: dict) -> str:
 
 def get_transcript_for_lesson(lesson_id: str) -> str:
     """Fetches the transcript for a lesson's YouTube video."""
-    lesson_doc = db.collection('lessons').document(lesson_id).get()
+    lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['youtube_link'])
     if not lesson_doc.exists:
         return ""
     
-    video_url = lesson_doc.to_dict().get('youtube_link', '')
-    if video_url and 'embed' in video_url:
-        video_id = video_url.split('/embed/')[-1]
+    video_id = video_id_from_url(lesson_doc.to_dict().get('youtube_link', ''))
+    if video_id:
         try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            return " ".join([item['text'] for item in transcript_list])
+            return open_transcript(video_id).text(separator=" ")
         except Exception as e:
             print(f"Could not get transcript for video {video_id}: {e}")
             return None # Return None to indicate a fetch error
     return ""
-"""
-def generate_quiz_with_nlp(text: str, num_questions: int = 5) -> dict:
-    if not quiz_model:
-        return {"quiz": []}
-        
-    doc = quiz_model(text)
-    
-    candidate_sents = [sent for sent in doc.sents if 10 < len(sent.text.split()) < 50 and sent.ents]
-    num_questions = min(num_questions, len(candidate_sents))
-    if num_questions == 0:
+
+
+def delete_job_response(job_id: str, message: str):
+    """202 with the delete job's id and where to poll it (shared by every route that queues a delete)."""
+    return jsonify({
+        'status': 'success',
+        'message': message,
+        'job_id': job_id,
+        'status_url': url_for('my_courses.delete_job_status', job_id=job_id)
+    }), 202
+
+def delete_queue_full_response():
+    response = jsonify({'status': 'error', 'message': 'Too many deletions in progress. Please try again shortly.'})
+    response.headers['Retry-After'] = '30'
+    return response, 503
+
+
+# --- Predictive prefetching of upcoming lessons ---
+PREFETCH_NEXT_LESSONS = int(os.environ.get("PREFETCH_NEXT_LESSONS", 2))
+
+def find_next_lessons(lesson_id: str, plan_id: str | None, count: int = PREFETCH_NEXT_LESSONS) -> list:
+    """
+    Returns up to `count` lesson snapshots following `lesson_id` in day_of_plan
+    order (crossing into the next module). Without `plan_id` the lesson's own
+    planId is used.
+    """
+    lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['moduleId', 'day_of_plan', 'planId'])
+    if not lesson_doc.exists:
+        return []
+    lesson_data = lesson_doc.to_dict()
+    plan_id = plan_id or lesson_data.get('planId')
+
+    next_lessons = list(
+        db.collection('lessons')
+        .where(filter=FieldFilter('moduleId', '==', lesson_data.get('moduleId')))
+        .where(filter=FieldFilter('day_of_plan', '>', lesson_data.get('day_of_plan', 0)))
+        .order_by('day_of_plan').limit(count).select([]).stream()
+    )
+    if len(next_lessons) < count and plan_id:
+        module_doc = db.collection('modules').document(lesson_data.get('moduleId')).get(field_paths=['module_number'])
+        module_number = module_doc.to_dict().get('module_number', 0) if module_doc.exists else 0
+        next_module_id = first_id(
+            db.collection('modules')
+            .where(filter=FieldFilter('planId', '==', plan_id))
+            .where(filter=FieldFilter('module_number', '>', module_number))
+            .order_by('module_number')
+        )
+        if next_module_id:
+            next_lessons += list(
+                db.collection('lessons')
+                .where(filter=FieldFilter('moduleId', '==', next_module_id))
+                .order_by('day_of_plan').limit(count - len(next_lessons)).select([]).stream()
+            )
+    return next_lessons
+
+def warm_lesson(lesson_id: str):
+    """Resolves the video link and generates the summary/quiz for a lesson ahead of time."""
+    lesson_ref = db.collection('lessons').document(lesson_id)
+    lesson_doc = lesson_ref.get(field_paths=VIDEO_LESSON_FIELDS)
+    if not lesson_doc.exists:
+        return
+    lesson_data = lesson_doc.to_dict()
+
+    if not lesson_data.get('youtube_link'):
+        video_url = get_semantically_best_video(lesson_data)
+        if video_url:
+            lesson_ref.set({'youtube_link': video_url, 'last_updated': firestore.SERVER_TIMESTAMP}, merge=True)
+            course_view_cache.invalidate_lesson(lesson_id, lesson_data.get('planId'))
+
+    if lesson_data.get('topic'):
+        get_or_generate_summary(
+            lesson_data.get('topic'), lesson_data.get('description', ''), generate_summary_and_quiz_from_lesson
+        )
+
+def _prefetch_after(user_id: str, lesson_id: str, plan_id: str | None):
+    for lesson in find_next_lessons(lesson_id, plan_id):
+        prefetcher.schedule(user_id, f'warm:{lesson.id}', warm_lesson, lesson.id)
+
+def schedule_prefetch(user_id: str, lesson_id: str, plan_id: str | None = None):
+    """Queues warming of the lessons after `lesson_id`; returns immediately."""
+    prefetcher.schedule(user_id, f'next:{lesson_id}', _prefetch_after, user_id, lesson_id, plan_id)
+
+def generate_quiz_with_nlp(text: str, num_questions: int = 5, seed: int | str | None = None) -> dict:
+    """Builds a cloze quiz from lesson text locally (no model download, no LLM call)."""
+    try:
+        return generate_cloze_quiz(text, num_questions=num_questions, seed=seed)
+    except Exception as e:
+        print(f"Local quiz generation error: {e}")
         return {"quiz": []}
 
-    selected_sents = random.sample(candidate_sents, num_questions)
-    quiz = []
-    for sent in selected_sents:
-        answer_entity = random.choice(sent.ents)
-        answer = answer_entity.text
-        question = sent.text.replace(answer, "_______")
-        
-        distractors = [ent.text for ent in doc.ents if ent.label_ == answer_entity.label_ and ent.text != answer]
-        if len(distractors) < 3:
-            answer_token = quiz_model(answer)[0]
-            if answer_token.has_vector:
-                similar_words = [token.text for token in doc if token.is_noun and token.has_vector and token.similarity(answer_token) > 0.6]
-                distractors.extend(similar_words)
-        
-        final_distractors = list(set(distractors))
-        if answer in final_distractors:
-            final_distractors.remove(answer)
-        
-        options = random.sample(final_distractors, min(3, len(final_distractors))) + [answer]
-        random.shuffle(options)
-        
-        quiz.append({"question": question, "options": options, "answer": answer})
-        
-    return {"quiz": quiz}
-"""
 # ----------------------------- PAGE ROUTES -----------------------------
 
 @my_courses_bp.route('/api/my-courses')
@@ -140,89 +191,20 @@ def course_details(plan_id):
         return redirect(url_for('login.login'))
     
     try:
-        # Get plan document and verify ownership
-        plan_ref = db.collection('plans').document(plan_id)
-        plan_doc = plan_ref.get()
-        if not plan_doc.exists or plan_doc.to_dict().get('userId') != session['user_id']:
+        # Assembled plan/modules/lessons/notes, cached per plan and verified for ownership
+        view = course_view_cache.get(plan_id, session['user_id'])
+        if view is None:
             return redirect(url_for('my_courses.list_my_courses'))
-        
-        plan_data = plan_doc.to_dict()
-        
-        # Initialize progress tracking variables
-        total_lessons = 0
-        completed_lessons = 0
-        
-        # Get all modules for this plan
-        modules_ref = db.collection('modules').where(
-            filter=FieldFilter('planId', '==', plan_id)
-        ).order_by('module_number').stream()
-        
-        modules_with_lessons = []
-        all_lessons_flat = []
-        
-        for module in modules_ref:
-            module_data = module.to_dict()
+
+        for module_data in view['modules']:
             module_data['module_number'] = module_data.get('module_number', '') or 'N/A'
-            
-            # Get all lessons for this module
-            lessons_ref = db.collection('lessons').where(
-                filter=FieldFilter('moduleId', '==', module.id)
-            ).order_by('day_of_plan').stream()
-            
-            module_lessons = []
-            for lesson in lessons_ref:
-                lesson_data = lesson.to_dict()
-                lesson_data['id'] = lesson.id
-                
-                # Track completion status
-                is_completed = lesson_data.get('is_completed', False)
-                if is_completed:
-                    completed_lessons += 1
-                total_lessons += 1
-                
-                module_lessons.append(lesson_data)
-                all_lessons_flat.append(lesson_data)
-            
-            module_data['lessons'] = module_lessons
-            modules_with_lessons.append(module_data)
-        
-        # Calculate progress percentage
-        progress = 0
-        if total_lessons > 0:
-            progress = round((completed_lessons / total_lessons) * 100)
-        
-        # Update plan progress if different from stored value
-        if plan_data.get('progress', 0) != progress:
-            plan_ref.update({
-                'progress': progress,
-                'last_updated': firestore.SERVER_TIMESTAMP
-            })
-            plan_data['progress'] = progress
-        
-        # Get all notes for this plan
-        notes_ref = db.collection('notes').where(
-            filter=FieldFilter('planId', '==', plan_id)
-        ).order_by('created_at', direction=firestore.Query.DESCENDING).stream()
-        
-        user_notes = []
-        for note in notes_ref:
-            note_data = note.to_dict()
-            note_data['id'] = note.id
-            
-            # Add lesson topic to note for display
-            for lesson in all_lessons_flat:
-                if lesson['id'] == note_data.get('lessonId'):
-                    note_data['topic'] = lesson['topic']
-                    break
-            
-            user_notes.append(note_data)
         
         return render_template(
             'my_course.html',
-            plan=plan_data,
-            modules=modules_with_lessons,
-            lessons=all_lessons_flat,
-            notes=user_notes,
+            plan=view['plan'],
+            modules=view['modules'],
+            lessons=view['lessons'],
+            notes=view['notes'],
             plan_id=plan_id
         )
         
@@ -235,43 +217,45 @@ def course_details(plan_id):
 
 @my_courses_bp.route('/plans/<string:plan_id>/delete', methods=['POST'])
 def delete_plan(plan_id):
-    """API endpoint to delete a specific plan and all its related data."""
+    """
+    API endpoint to delete a specific plan and all its related data.
+    The cascade runs as a background job (202); poll status_url for progress.
+    """
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
         user_id = session['user_id']
-        plan_ref = db.collection('plans').document(plan_id)
-        plan_doc = plan_ref.get()
+        plan_doc = db.collection('plans').document(plan_id).get(field_paths=['userId', *PLAN_FIELDS])
 
         # Security check: Make sure the plan belongs to the logged-in user
         if not plan_doc.exists or plan_doc.to_dict().get('userId') != user_id:
             return jsonify({'status': 'error', 'message': 'Plan not found or permission denied.'}), 404
 
-        # Find and delete all associated modules and lessons
-        modules_query = db.collection('modules').where(filter=FieldFilter('planId', '==', plan_id)).stream()
-        module_ids = [module.id for module in modules_query]
-
-        if module_ids:
-            lessons_query = db.collection('lessons').where(filter=FieldFilter('moduleId', 'in', module_ids)).stream()
-            for lesson in lessons_query:
-                lesson.reference.delete()
-        
-        for module_id in module_ids:
-            db.collection('modules').document(module_id).delete()
-        
-        # Find and delete all associated notes
-        notes_query = db.collection('notes').where(filter=FieldFilter('planId', '==', plan_id)).stream()
-        for note in notes_query:
-            note.reference.delete()
-
-        # Finally, delete the plan itself
-        plan_ref.delete()
-        
-        return jsonify({'status': 'success', 'message': 'Plan deleted successfully.'})
+        plan_data = plan_doc.to_dict()
+        job_id = submit_plan_deletion(user_id, {plan_id: {field: plan_data.get(field) for field in PLAN_FIELDS}})
+        return delete_job_response(job_id, 'Plan deletion started.')
+    except QueueFullError:
+        return delete_queue_full_response()
     except Exception as e:
         print(f"Delete Plan Error: {e}")
         return jsonify({'status': 'error', 'message': 'An error occurred while deleting the plan.'}), 500
+
+@my_courses_bp.route('/delete-jobs/<string:job_id>', methods=['GET'])
+def delete_job_status(job_id):
+    """Reports a delete job as queued / running (with progress) / done / failed."""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    job = delete_jobs.get(job_id)
+    if not job or job['owner'] != session['user_id']:
+        return jsonify({'status': 'error', 'message': 'Job not found.'}), 404
+
+    if job['state'] == JOB_DONE:
+        return jsonify({'status': 'success', 'job_state': job['state'], 'result': job['result']})
+    if job['state'] == JOB_FAILED:
+        return jsonify({'status': 'error', 'job_state': job['state'], 'message': 'Deletion failed. Please try again.'}), 500
+    return jsonify({'status': 'pending', 'job_state': job['state'], 'progress': job['progress']})
     
 # ----------------------------- API ROUTES -----------------------------
 @my_courses_bp.route('/get-video-for-lesson/<string:lesson_id>', methods=['POST'])
@@ -281,7 +265,7 @@ def get_video_for_lesson(lesson_id):
     
     try:
         lesson_ref = db.collection('lessons').document(lesson_id)
-        lesson_doc = lesson_ref.get()
+        lesson_doc = lesson_ref.get(field_paths=VIDEO_LESSON_FIELDS)
         
         # Create document if it doesn't exist
         if not lesson_doc.exists:
@@ -318,6 +302,7 @@ def get_video_for_lesson(lesson_id):
             'youtube_link': video_url,
             'last_updated': firestore.SERVER_TIMESTAMP
         }, merge=True)
+        course_view_cache.invalidate_lesson(lesson_id, lesson_data.get('planId'))
         
         return jsonify({
             'status': 'success',
@@ -328,6 +313,60 @@ def get_video_for_lesson(lesson_id):
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@my_courses_bp.route('/modules/<string:module_id>/videos', methods=['POST'])
+def resolve_module_videos(module_id):
+    """
+    Resolves videos for a module's lessons in one call, searching concurrently.
+    `?limit=N` restricts it to the first N lessons (by day) so a caller can warm
+    the start of a module without spending search quota on all of it.
+    """
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    limit = request.args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            return jsonify({'status': 'error', 'message': 'limit must be a positive integer'}), 400
+        limit = int(limit)
+
+    try:
+        module_doc = db.collection('modules').document(module_id).get(field_paths=['planId'])
+        if not module_doc.exists:
+            return jsonify({'status': 'error', 'message': 'Module not found'}), 404
+        plan_doc = db.collection('plans').document(module_doc.to_dict().get('planId')).get(field_paths=['userId'])
+        if not plan_doc.exists or plan_doc.to_dict().get('userId') != session['user_id']:
+            return jsonify({'status': 'error', 'message': 'Module not found or permission denied'}), 404
+
+        lessons = [
+            lesson.to_dict() | {'id': lesson.id}
+            for lesson in project(
+                db.collection('lessons').where(filter=FieldFilter('moduleId', '==', module_id)),
+                ['topic', 'description', 'youtube_link', 'day_of_plan']
+            )
+        ]
+        if limit is not None:
+            lessons = sorted(lessons, key=lambda lesson: lesson.get('day_of_plan', 0))[:limit]
+        videos = {lesson['id']: lesson['youtube_link'] for lesson in lessons if lesson.get('youtube_link')}
+        missing = [lesson for lesson in lessons if not lesson.get('youtube_link')]
+
+        candidates_by_query = search_videos_batch([lesson_search_query(lesson) for lesson in missing])
+        with ChunkedBatchWriter(db) as writer:
+            for lesson in missing:
+                video_url = pick_best_video(lesson, candidates_by_query.get(lesson_search_query(lesson), []))
+                if video_url:
+                    videos[lesson['id']] = video_url
+                    writer.set(db.collection('lessons').document(lesson['id']), {
+                        'youtube_link': video_url,
+                        'last_updated': firestore.SERVER_TIMESTAMP
+                    }, merge=True)
+        if missing:
+            course_view_cache.mark_changed(plan_doc.id)
+
+        return jsonify({'status': 'success', 'videos': videos, 'resolved': len(missing)})
+    except Exception as e:
+        print(f"Module video batch error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @my_courses_bp.route('/lessons/<string:lesson_id>/completion', methods=['POST'])
 def update_lesson_completion(lesson_id):
     """API endpoint to update lesson completion status and track overall progress"""
@@ -342,35 +381,21 @@ def update_lesson_completion(lesson_id):
         if not plan_id:
             return jsonify({'status': 'error', 'message': 'Plan ID is required'}), 400
 
-        # Update the lesson completion status
-        lesson_ref = db.collection('lessons').document(lesson_id)
-        lesson_ref.update({
-            'is_completed': is_completed,
-            'last_updated': firestore.SERVER_TIMESTAMP
-        })
-
-        # Recalculate overall progress for the plan
-        modules_query = db.collection('modules').where(filter=FieldFilter('planId', '==', plan_id)).stream()
-        total_lessons = 0
-        completed_lessons = 0
-        
-        for module in modules_query:
-            lessons_query = db.collection('lessons').where(filter=FieldFilter('moduleId', '==', module.id)).stream()
-            for lesson in lessons_query:
-                total_lessons += 1
-                if lesson.to_dict().get('is_completed', False):
-                    completed_lessons += 1
-
-        progress = 0
-        if total_lessons > 0:
-            progress = round((completed_lessons / total_lessons) * 100)
-
-        # Update the plan's progress
-        plan_ref = db.collection('plans').document(plan_id)
-        plan_ref.update({
-            'progress': progress,
-            'last_updated': firestore.SERVER_TIMESTAMP
-        })
+        # Flip the lesson and adjust the plan's counters in one transaction
+        try:
+            counters = set_lesson_completion(plan_id, lesson_id, is_completed, session['user_id'])
+        except PlanNotFoundError:
+            return jsonify({'status': 'error', 'message': 'Lesson or plan not found'}), 404
+        progress = counters['progress']
+        if counters['changed']:
+            course_view_cache.invalidate(plan_id)
+            try:
+                record_lesson_completion(session['user_id'], lesson_id, is_completed)
+            except Exception as e:
+                print(f"Activity ledger update failed: {e}")
+
+        if is_completed:
+            schedule_prefetch(session['user_id'], lesson_id, plan_id)
 
         return jsonify({
             'status': 'success',
@@ -389,10 +414,11 @@ def ensure_video_link(lesson_id):
     """Endpoint to verify and fix missing video links"""
     try:
         lesson_ref = db.collection('lessons').document(lesson_id)
-        lesson_data = lesson_ref.get().to_dict()
+        lesson_doc = lesson_ref.get(field_paths=VIDEO_LESSON_FIELDS)
         
-        if not lesson_data:
+        if not lesson_doc.exists:
             return jsonify({'status': 'error', 'message': 'Lesson not found'}), 404
+        lesson_data = lesson_doc.to_dict()
 
         # If link exists and is valid
         if lesson_data.get('youtube_link'):
@@ -411,6 +437,7 @@ def ensure_video_link(lesson_id):
             }), 404
 
         lesson_ref.set({'youtube_link': video_url}, merge=True)
+        course_view_cache.invalidate_lesson(lesson_id, lesson_data.get('planId'))
         return jsonify({
             'status': 'success',
             'action': 'new_link_generated',
@@ -426,7 +453,9 @@ def get_lesson(lesson_id):
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        lesson_doc = db.collection('lessons').document(lesson_id).get()
+        lesson_doc = db.collection('lessons').document(lesson_id).get(
+            field_paths=['topic', 'description', 'youtube_link', 'status']
+        )
         if not lesson_doc.exists:
             return jsonify({'status': 'error', 'message': 'Lesson not found'}), 404
         
@@ -446,32 +475,49 @@ def get_lesson(lesson_id):
     
 
 # backend/routes/my_courses_route.py
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+from youtube_transcript_api import TranscriptsDisabled, NoTranscriptFound
+def _optional_seconds(value) -> float | None:
+    """A time offset from the request body; raises ValueError/TypeError when it isn't a usable number."""
+    if value is None:
+        return None
+    seconds = float(value)
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(value)
+    return seconds
+
 @my_courses_bp.route('/lesson/<string:lesson_id>/transcript', methods=['POST'])
 def get_transcript(lesson_id):
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
 
     try:
-        lesson_doc = db.collection('lessons').document(lesson_id).get()
+        lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['youtube_link'])
         if not lesson_doc.exists:
             return jsonify({'status': 'error', 'message': 'Lesson not found'}), 404
 
         lesson_data = lesson_doc.to_dict()
         video_url = lesson_data.get('youtube_link', '')
 
-        if 'embed/' not in video_url:
+        video_id = video_id_from_url(video_url)
+        if not video_id:
             return jsonify({'status': 'error', 'message': 'Invalid YouTube URL for this lesson.'}), 400
 
-        video_id = video_url.split('embed/')[-1]
+        # Optional time range (seconds) so long lectures can be read a section at a time
+        data = request.get_json(silent=True) or {}
+        try:
+            start = _optional_seconds(data.get('start'))
+            end = _optional_seconds(data.get('end'))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'start and end must be non-negative numbers of seconds.'}), 400
 
-        # This line will now be handled by the specific exceptions below
-        transcript_items = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = "\n".join([item['text'] for item in transcript_items])
+        # Fetched from YouTube once per video, then served from the chunked store.
+        # Missing captions are handled by the specific exceptions below
+        transcript = open_transcript(video_id)
 
         return jsonify({
             'status': 'success',
-            'transcript': transcript_text,
+            'transcript': transcript.text(start, end),
+            'duration': transcript.duration,
             'video_url': video_url
         })
 
@@ -488,19 +534,15 @@ def get_transcript(lesson_id):
         return jsonify({'status': 'error', 'message': 'A server error occurred while trying to fetch the transcript.'}), 500
 
 
-from google import genai
+from backend.services.llm_gateway import llm_gateway
+from backend.services.summary_cache import get_or_generate_summary
 
 # ... (all your existing imports) ...
 import json
 def generate_llm_summary(video_title: str, video_description: str) -> str:
     # This function remains the same as before
-    GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
+    if not llm_gateway.is_configured():
         return "Summary generation is currently disabled by the administrator."
-
-    # New Client Initialization
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    model_id = 'gemini-2.5-flash'
     
     prompt = f"""
     You are an expert content analyst. Based on the following video title and description, generate a concise, single-paragraph summary of about 100-150 words.
@@ -512,13 +554,7 @@ def generate_llm_summary(video_title: str, video_description: str) -> str:
     **Generated Summary:**
     """
     try:
-        response = client.models.generate_content(
-            model=model_id,
-            contents=[
-                {"role": "user", "parts": [{"text": prompt}]}
-            ]
-        )
-        return response.text
+        return llm_gateway.generate_text(prompt)
     except Exception as e:
         print(f"LLM Summary Generation Failed: {e}")
         return "The AI summary could not be generated at this time. Please try again later."
@@ -531,14 +567,9 @@ def generate_summary_and_quiz_from_lesson(title: str, description: str) -> dict:
     Uses the Gemini API to generate a detailed summary and a conceptual quiz
     in a single call, returning them in a structured JSON object.
     """
-    GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
+    if not llm_gateway.is_configured():
         return {"summary": "Content generation is disabled by the administrator.", "quiz": []}
 
-    genai.configure(api_key=GOOGLE_API_KEY)
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    model_id = 'gemini-2.5-flash'
-
     # A more sophisticated prompt for a combined task
     prompt = f"""
     You are an expert instructor and content creator. Perform the following two tasks based on the provided lesson topic and description. Your response MUST be ONLY the raw JSON object, without any markdown formatting.
@@ -557,15 +588,10 @@ def generate_summary_and_quiz_from_lesson(title: str, description: str) -> dict:
     {{"summary": "Your detailed summary here...", "quiz": [{{"question": "...", "options": ["...", "...", "..."], "answer": "..."}}]}}
     """
     try:
-        response = client.models.generate_content(
-            model=model_id,
-            contents=[
-                {"role": "user", "parts": [{"text": prompt}]}
-            ]
-        )
+        response_text = llm_gateway.generate_text(prompt)
         
         # Use regex to find and parse the JSON object
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
         if json_match:
             json_string = json_match.group(0)
             data = json.loads(json_string)
@@ -578,6 +604,74 @@ def generate_summary_and_quiz_from_lesson(title: str, description: str) -> dict:
         print(f"Content Generation Failed: {e}")
         return {"summary": "An error occurred while generating content.", "quiz": []}
 
+# --- Local fallback when the LLM is slow or rate-limited ---
+SUMMARY_LLM_TIMEOUT_SECONDS = float(os.environ.get("SUMMARY_LLM_TIMEOUT_SECONDS", 8))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", 8))
+# Generations queued or running at once; beyond this, requests answer locally without queueing another.
+SUMMARY_MAX_PENDING = int(os.environ.get("SUMMARY_MAX_PENDING", SUMMARY_WORKERS * 2))
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS)
+_summary_slots = threading.BoundedSemaphore(SUMMARY_MAX_PENDING)
+
+def _submit_summary(title: str, description: str):
+    """Queues a summary generation, or returns None when SUMMARY_MAX_PENDING are already outstanding."""
+    if not _summary_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _summary_executor.submit(
+            get_or_generate_summary, title, description, generate_summary_and_quiz_from_lesson
+        )
+    except Exception:
+        _summary_slots.release()
+        raise
+    future.add_done_callback(lambda _: _summary_slots.release())
+    return future
+
+def stored_transcript_for_lesson(lesson_id: str) -> str:
+    """The lesson's transcript if it is already stored; never fetches from YouTube."""
+    lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['youtube_link'])
+    video_id = video_id_from_url(lesson_doc.to_dict().get('youtube_link', '')) if lesson_doc.exists else None
+    transcript = open_stored_transcript(video_id) if video_id else None
+    return transcript.text(separator=" ") if transcript else ""
+
+def local_quiz_for_lesson(lesson_id: str, description: str = "", num_questions: int = 5,
+                          stored_only: bool = False) -> dict:
+    """
+    Cloze quiz from the lesson's transcript, falling back to its description.
+    With `stored_only`, a transcript that isn't stored yet is not fetched.
+    """
+    transcript = stored_transcript_for_lesson(lesson_id) if stored_only else get_transcript_for_lesson(lesson_id)
+    quiz = generate_quiz_with_nlp(transcript, num_questions, seed=lesson_id) if transcript else {"quiz": []}
+    if not quiz["quiz"] and description:
+        quiz = generate_quiz_with_nlp(description, num_questions, seed=lesson_id)
+    return quiz
+
+def local_summary_and_quiz(lesson_id: str, title: str, description: str) -> dict:
+    return {
+        'summary': description or title,
+        'quiz': local_quiz_for_lesson(lesson_id, description, stored_only=True)['quiz'],
+        'generated_locally': True
+    }
+
+@my_courses_bp.route('/lesson/<string:lesson_id>/generate-quiz', methods=['POST'])
+def generate_lesson_quiz(lesson_id):
+    """API endpoint to generate a quiz for a lesson locally from its transcript."""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    try:
+        lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['description'])
+        if not lesson_doc.exists:
+            return jsonify({'status': 'error', 'message': 'Lesson not found'}), 404
+
+        quiz = local_quiz_for_lesson(lesson_id, lesson_doc.to_dict().get('description', ''))
+        if not quiz['quiz']:
+            return jsonify({'status': 'error', 'message': 'Not enough lesson content to build a quiz.'}), 422
+        return jsonify({'status': 'success', 'quiz': quiz['quiz']})
+
+    except Exception as e:
+        print(f"Quiz route error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # In my_courses_route.py
 
 # --- REPLACE the existing route with this simplified version ---
@@ -589,7 +683,7 @@ def get_lesson_summary_and_quiz(lesson_id):
 
     try:
         # 1. Fetch lesson details
-        lesson_doc = db.collection('lessons').document(lesson_id).get()
+        lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['topic', 'description'])
         lesson_data = lesson_doc.to_dict() if lesson_doc.exists else {}
         title = lesson_data.get('topic', '')
         description = lesson_data.get('description', '')
@@ -597,14 +691,27 @@ def get_lesson_summary_and_quiz(lesson_id):
         if not title:
             return jsonify({'status': 'error', 'message': 'Lesson title is missing.'}), 400
 
-        # 2. Call the new all-in-one function
-        generated_content = generate_summary_and_quiz_from_lesson(title, description)
+        # 2. Reuse the stored summary for this lesson content, or generate it once.
+        # The LLM gets a time budget; if it's slow or fails, answer from the lesson
+        # text and let the generation keep running to fill the cache. When too many
+        # generations are already outstanding, answer locally straight away.
+        future = _submit_summary(title, description)
+        generated_content, from_cache = None, False
+        if future is not None:
+            try:
+                generated_content, from_cache = future.result(timeout=SUMMARY_LLM_TIMEOUT_SECONDS)
+            except FutureTimeoutError:
+                pass
+
+        if not generated_content or not generated_content.get('quiz'):
+            return jsonify({'status': 'success', **local_summary_and_quiz(lesson_id, title, description), 'from_cache': False})
 
         # 3. Return the combined data
         return jsonify({
             'status': 'success',
             'summary': generated_content.get('summary'),
-            'quiz': generated_content.get('quiz')
+            'quiz': generated_content.get('quiz'),
+            'from_cache': from_cache
         })
 
     except Exception as e:
@@ -619,6 +726,8 @@ def update_lesson_status(lesson_id):
     try:
         new_status = request.get_json().get('status')
         db.collection('lessons').document(lesson_id).update({'status': new_status})
+        course_view_cache.invalidate_lesson(lesson_id)
+        schedule_prefetch(session['user_id'], lesson_id)
         return jsonify({'status': 'success'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -631,13 +740,18 @@ def get_notes_for_lesson(lesson_id):
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     
     try:
-        # Query Firestore for notes linked to this lesson AND this user
-        notes_ref = db.collection('notes').where(filter=FieldFilter('lessonId', '==', lesson_id)).where(filter=FieldFilter('userId', '==', session['user_id'])).stream()
+        # Query Firestore for notes linked to this lesson AND this user, one page at a time
+        notes_query = db.collection('notes').where(filter=FieldFilter('lessonId', '==', lesson_id)).where(filter=FieldFilter('userId', '==', session['user_id']))
+        notes_page, next_cursor = fetch_page(
+            notes_query, db.collection('notes'), request.args.get('cursor'), page_size_from(request.args)
+        )
         
         # Create a list of notes from the query results
-        notes = [note.to_dict() | {'id': note.id} for note in notes_ref]
+        notes = [note.to_dict() | {'id': note.id} for note in notes_page]
         
-        return jsonify({'status': 'success', 'notes': notes})
+        return jsonify({'status': 'success', 'notes': notes, 'next_cursor': next_cursor})
+    except InvalidCursorError:
+        return jsonify({'status': 'error', 'message': 'Invalid or expired cursor'}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -671,6 +785,7 @@ def add_note(plan_id):
         
         # Add the new note to the 'notes' collection
         update_time, note_ref = db.collection('notes').add(note_data)
+        course_view_cache.mark_changed(plan_id)
         
         return jsonify({'status': 'success', 'message': 'Note saved!', 'noteId': note_ref.id})
     except Exception as e:
@@ -683,15 +798,24 @@ def api_list_my_courses():
     if 'user_id' not in session: return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
     try:
         user_id = session['user_id']
-        plans_ref = db.collection('plans').where('userId', '==', user_id).order_by('creation_date', direction='DESCENDING').stream()
+        cursor, page_size = request.args.get('cursor'), page_size_from(request.args)
+        etag = make_etag('plans', user_id, cursor, page_size, *plan_list_version(user_id))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        plans_query = db.collection('plans').where('userId', '==', user_id).order_by('creation_date', direction='DESCENDING')
+        plans_page, next_cursor = fetch_page(plans_query, db.collection('plans'), cursor, page_size)
         user_plans = []
-        for plan in plans_ref:
+        for plan in plans_page:
             plan_data = plan.to_dict()
             plan_data['id'] = plan.id
             if 'creation_date' in plan_data and hasattr(plan_data['creation_date'], 'isoformat'):
                 plan_data['creation_date'] = plan_data['creation_date'].isoformat()
             user_plans.append(plan_data)
-        return jsonify({'status': 'success', 'plans': user_plans})
+        return json_response({'status': 'success', 'plans': user_plans, 'next_cursor': next_cursor}, etag)
+    except InvalidCursorError:
+        return jsonify({'status': 'error', 'message': 'Invalid or expired cursor'}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
     
@@ -701,44 +825,23 @@ def api_course_details(plan_id):
     if 'user_id' not in session: return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
 
     try:
+        # One plan read decides between 304 and the (cached) course view
         plan_doc = db.collection('plans').document(plan_id).get()
         if not plan_doc.exists or plan_doc.to_dict().get('userId') != session['user_id']:
             return jsonify({'status': 'error', 'message': 'Plan not found or permission denied'}), 404
-        
-        plan_data = plan_doc.to_dict()
-        plan_data['id'] = plan_doc.id
 
-        modules_ref = db.collection('modules').where('planId', '==', plan_id).order_by('module_number').stream()
-        
-        modules_with_lessons = []
-        total_lessons_count = 0
-        completed_lessons_count = 0
-
-        for module in modules_ref:
-            module_data = module.to_dict()
-            module_data['id'] = module.id
-            lessons_ref = db.collection('lessons').where('moduleId', '==', module.id).order_by('day_of_plan').stream()
-            
-            lessons_list = []
-            for lesson in lessons_ref:
-                lesson_data = lesson.to_dict()
-                lesson_data['id'] = lesson.id
-                lessons_list.append(lesson_data)
-                total_lessons_count += 1
-                if lesson_data.get('is_completed', False):
-                    completed_lessons_count += 1
-
-            module_data['lessons'] = lessons_list
-            modules_with_lessons.append(module_data)
-        
-        progress = round((completed_lessons_count / total_lessons_count) * 100) if total_lessons_count > 0 else 0
-        plan_data['progress'] = progress
+        plan_data = plan_doc.to_dict()
+        etag = make_etag('plan', plan_id, *plan_version(plan_data))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
 
-        return jsonify({
+        view = course_view_cache.get(plan_id, session['user_id'], plan_data)
+        return json_response({
             'status': 'success',
-            'plan': plan_data,
-            'modules': modules_with_lessons
-        })
+            'plan': view['plan'] | {'id': plan_id},
+            'modules': view['modules']
+        }, etag)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -759,20 +862,21 @@ def show_quizzes_page():
 
     try:
         # --- Part 1: Gather Data for Stats and History ---
-        attempts_ref = db.collection('quiz_attempts').where(
+        attempts_query = db.collection('quiz_attempts').where(
             filter=FieldFilter('userId', '==', user_id)
-        ).order_by('submitted_at', direction=firestore.Query.DESCENDING).stream()
+        ).order_by('submitted_at', direction=firestore.Query.DESCENDING)
 
         history = []
-        total_score_sum = 0
-        highest_score = 0
-        
-        all_lessons = {doc.id: doc.to_dict() for doc in db.collection('lessons').stream()}
 
-        for attempt in attempts_ref:
+        # History is paginated
+        attempts_page, next_cursor = fetch_page(
+            attempts_query, db.collection('quiz_attempts'), request.args.get('cursor'), page_size_from(request.args)
+        )
+        # Topics for just this page's lessons (batched get_all behind an LRU)
+        topics = lesson_topics(attempt.to_dict().get('lessonId') for attempt in attempts_page)
+        for attempt in attempts_page:
             attempt_data = attempt.to_dict()
             lesson_id = attempt_data.get('lessonId')
-            lesson_info = all_lessons.get(lesson_id, {})
 
             score_percent = round((attempt_data.get('score', 0) / attempt_data.get('total', 1)) * 100)
 
@@ -783,55 +887,32 @@ def show_quizzes_page():
             date_str = submitted_at.strftime('%B %d, %Y') if submitted_at else "N/A"
 
             history.append({
-                "topic": lesson_info.get('topic', 'Unknown Topic'),
+                "topic": topics.get(lesson_id) or 'Unknown Topic',
                 "date": date_str,
                 "score": f"{score_percent}% ({attempt_data.get('score')}/{attempt_data.get('total')})",
                 "lessonId": lesson_id,
                 "planId": attempt_data.get('planId')
             })
-            
-            total_score_sum += score_percent
-            if score_percent > highest_score:
-                highest_score = score_percent
-
-        total_taken = len(history)
-        stats = {
-            'total_taken': total_taken,
-            'average_score': round(total_score_sum / total_taken) if total_taken > 0 else 0,
-            'highest_score': highest_score,
-            'last_attempt': history[0]['topic'] if history else "N/A"
-        }
+
+        # Stats panel: one aggregate document, maintained on every submission
+        stats = user_quiz_stats(user_id)
 
         # This is used by the web template
         available_quizzes = list({item['topic']: item for item in history}.values())[:4]
 
-        # --- Part 2: Gather Data for Leaderboard ---
-        all_users = {doc.id: doc.to_dict() for doc in db.collection('users').stream()}
-        user_scores = {}
-
-        all_attempts = db.collection('quiz_attempts').stream()
-        for attempt in all_attempts:
-            data = attempt.to_dict()
-            uid = data.get('userId')
-            score = data.get('score', 0)
-            user_scores[uid] = user_scores.get(uid, 0) + score
-            
-        sorted_users = sorted(user_scores.items(), key=lambda item: item[1], reverse=True)
-        
-        leaderboard = []
-        for i, (uid, total_score) in enumerate(sorted_users[:5]):
-            user_info = all_users.get(uid, {})
-            leaderboard.append({
-                'rank': i + 1,
-                'name': user_info.get('username', 'Anonymous User'),
-                'score': total_score
-            })
+        # --- Part 2: Leaderboards (materialized top-K snapshots, one document each) ---
+        leaderboard = top_scores('all_time')
+        weekly_leaderboard = top_scores('weekly')
+        monthly_leaderboard = top_scores('monthly')
         
         # --- Part 3: Return Correct Format Based on Request ---
         data_to_send = {
             'stats': stats, 
             'quiz_history': history, 
+            'next_cursor': next_cursor,
             'leaderboard': leaderboard,
+            'weekly_leaderboard': weekly_leaderboard,
+            'monthly_leaderboard': monthly_leaderboard,
             'available_quizzes': available_quizzes
         }
 
@@ -847,6 +928,10 @@ def show_quizzes_page():
         else:
             return render_template('quizzes.html', **data_to_send)
 
+    except InvalidCursorError:
+        if 'application/json' in request.headers.get('Accept', ''):
+            return jsonify({'status': 'error', 'message': 'Invalid or expired cursor'}), 400
+        return redirect(url_for('my_courses.show_quizzes_page'))
     except Exception as e:
         print(f"Quizzes page error: {e}")
         if 'application/json' in request.headers.get('Accept', ''):
@@ -880,6 +965,17 @@ def submit_quiz_score(lesson_id):
             'total': total,
             'submitted_at': firestore.SERVER_TIMESTAMP
         })
+
+        # The attempt is saved; aggregates can be rebuilt from attempts if this fails
+        try:
+            topic = lesson_topics([lesson_id]).get(lesson_id)
+            record_quiz_attempt(session['user_id'], session.get('username'), score, total, lesson_id, topic)
+        except Exception as e:
+            print(f"Quiz aggregate update failed: {e}")
+        try:
+            record_quiz_submission(session['user_id'], lesson_id, score, total)
+        except Exception as e:
+            print(f"Activity ledger update failed: {e}")
         
         return jsonify({'status': 'success', 'message': 'Score saved!'})
     except Exception as e:
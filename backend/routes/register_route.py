@@ -2,6 +2,7 @@ from flask import Blueprint, request, render_template, url_for, jsonify, flash,
 from werkzeug.security import generate_password_hash
 from backend import db
 from google.cloud.firestore_v1.base_query import FieldFilter
+from backend.services.queries import exists
 
 register_bp = Blueprint('register', __name__)
 
@@ -21,13 +22,11 @@ def register():
 
         try:
             users_ref = db.collection('users')
-            email_check = users_ref.where(filter=FieldFilter('email', '==', email)).limit(1).stream()
-            if next(email_check, None):
+            if exists(users_ref.where(filter=FieldFilter('email', '==', email))):
                 flash('An account with this email already exists.', 'error')
                 return render_template('register.html')
 
-            username_check = users_ref.where(filter=FieldFilter('username', '==', username)).limit(1).stream()
-            if next(username_check, None):
+            if exists(users_ref.where(filter=FieldFilter('username', '==', username))):
                 flash('This username is already taken.', 'error')
                 return render_template('register.html')
                 
@@ -1,80 +1,52 @@
 from flask import Blueprint, request, jsonify, session, redirect, url_for, flash, render_template
 from backend import db
+from backend.services.plan_cache import plan_cache, plan_cache_key
+from backend.services.plan_generator import generate_plan_fanout
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.job_queue import JobQueue, QueueFullError, JOB_DONE, JOB_FAILED
+from backend.services.popularity import popularity_index
+from backend.services.similarity_index import similarity_index
+from backend.services.course_tree import LESSONS_KEYED_FLAG
+from backend.services.llm_gateway import llm_gateway
 from dotenv import load_dotenv
 import os
-from google import genai
-import requests
-import json
 from firebase_admin import firestore
-import re
-from collections import Counter
 
 load_dotenv()
 start_plan_bp = Blueprint('start_plan', __name__)
 
 # --- API Key Configuration ---
-try:
-    GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-    YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY not found in .env file.")
-    # Initialize the new Client
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-except (ValueError, TypeError) as e:
-    print(f"FATAL ERROR: API keys not configured correctly. {e}")
-    client = None
-    YOUTUBE_API_KEY = None
+# The Gemini client itself lives in the shared LLM gateway.
+YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+if not llm_gateway.is_configured():
+    print("FATAL ERROR: API keys not configured correctly. GOOGLE_API_KEY not found in .env file.")
+
+# --- Plan Generation Job Queue ---
+# Generation runs on a local worker pool so request workers are released immediately.
+plan_jobs = JobQueue(
+    'plan_generation',
+    max_workers=int(os.environ.get("PLAN_JOB_WORKERS", 4)),
+    max_pending=int(os.environ.get("PLAN_JOB_MAX_PENDING", 32))
+)
 
 # ----------------------------- HELPER FUNCTIONS -----------------------------
 
-def generate_structured_plan_from_gemini(topic: str, difficulty: str, timeline_months: int) -> dict | None:
-    if not client:
+PLAN_MODEL_ID = 'gemini-2.5-flash'
+
+def _generate_plan_text(prompt: str) -> str:
+    return llm_gateway.generate_text(prompt, model=PLAN_MODEL_ID)
+
+def generate_structured_plan_from_gemini(topic: str, difficulty: str, timeline_months: int, progress=None) -> dict | None:
+    """
+    Generates a plan with the two-phase fan-out generator (outline, then
+    modules in parallel), publishing each finished module through `progress`.
+    """
+    if not llm_gateway.is_configured():
         print("CRITICAL: Gemini Client is not initialized.")
         return None
 
-    model_id = 'gemini-2.5-flash' 
-    
-    prompt = f"""
-    Generate a day-by-day learning plan for:
-    Topic: "{topic}" | Level: "{difficulty}" | Duration: {timeline_months} months
-
-    Constraints:
-    1. Total lessons = {int(timeline_months) * 20} (20 days/month).
-    2. Pace: Basic -> Advanced. No filler days.
-    3. Output JSON ONLY. No markdown.
-
-    Expected JSON Structure:
-    {{
-      "plan_title": "string",
-      "modules": [
-        {{
-          "module_title": "string",
-          "module_number": 1,
-          "lessons": [
-            {{
-              "day_of_plan": 1,
-              "topic": "string",
-              "description": "string",
-              "Youtube_keywords": "string"
-            }}
-          ]
-        }}
-      ]
-    }}
-    """
     try:
-        # New API Call with explicit structure to avoid 400 Bad Request
-        response = client.models.generate_content(
-            model=model_id,
-            contents=[
-                {"role": "user", "parts": [{"text": prompt}]}
-            ]
-        )
-        # Result text access might differ slightly, usually response.text works
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
-        raise ValueError("No valid JSON object found in the AI response.")
+        return generate_plan_fanout(topic, difficulty, timeline_months, _generate_plan_text, progress)
     except Exception as e:
         print(f"CRITICAL GEMINI ERROR: {str(e)}") # Print explicitly for Azure Logs
         return None
@@ -87,45 +59,109 @@ def show_start_plan():
         return redirect(url_for('login.login'))
     return render_template('start_plan.html', user_id=session['user_id'])
 
-# This route is kept for compatibility with the frontend if it's still being used
-@start_plan_bp.route('/get_recommendations', methods=['GET'])
-def get_recommendations():
+def _popular_plans_response():
     """
-    Generates course recommendations based on the most popular plan titles
-    in the Firestore database.
+    Shared implementation of the recommendation endpoints.
+    `?mode=similar` returns titles similar to the user's own plans, falling
+    back to the most popular titles when the user has no plans yet.
     """
     if 'user_id' not in session:
         return jsonify({"status": "error", "message": "Authentication required."}), 401
-    
+
     try:
-        plans_ref = db.collection('plans').stream()
-        all_titles = [plan.to_dict().get('plan_title') for plan in plans_ref if plan.to_dict().get('plan_title')]
-        
-        if not all_titles:
-            return jsonify({"status": "success", "recommendations": []})
-            
-        title_counts = Counter(all_titles)
-        most_common_titles = [title for title, count in title_counts.most_common(5)]
-        
-        return jsonify({"status": "success", "recommendations": most_common_titles}), 200
-        
+        if request.args.get('mode') == 'similar':
+            similar_titles = similarity_index.similar_for_user(session['user_id'], 5)
+            if similar_titles:
+                return jsonify({"status": "success", "mode": "similar", "recommendations": similar_titles}), 200
+
+        most_common_titles = popularity_index.top_titles(5)
+        return jsonify({"status": "success", "mode": "popular", "recommendations": most_common_titles}), 200
     except Exception as e:
         print(f"Recommendation Error: {e}")
         return jsonify({"status": "error", "message": "Could not fetch recommendations."}), 500
 
+# This route is kept for compatibility with the frontend if it's still being used
+@start_plan_bp.route('/get_recommendations', methods=['GET'])
+def get_recommendations():
+    """
+    Generates course recommendations based on the most popular plan titles,
+    read from the incrementally maintained popularity index.
+    """
+    return _popular_plans_response()
+
+
+# The routes consult the plan cache before submitting, so the jobs only generate and store.
+def _run_plan_generation_job(topic: str, difficulty: str, timeline_months: int, progress=None) -> dict:
+    plan_data = generate_structured_plan_from_gemini(topic, difficulty, timeline_months, progress)
+    if not plan_data or not plan_data.get('modules'):
+        raise ValueError("Failed to generate plan from AI.")
+    plan_cache.set(plan_cache_key(topic, difficulty, timeline_months), plan_data)
+    return plan_data
+
+def _plan_queue_full_response():
+    response = jsonify({"status": "error", "message": "The plan generator is busy. Please try again shortly."})
+    response.headers['Retry-After'] = '30'
+    return response, 503
 
 @start_plan_bp.route('/generate_plan', methods=['POST'])
 def generate_plan():
+    """
+    Enqueues plan generation and returns a job ID right away (202).
+    Poll /generate_plan/jobs/<job_id>: while the job runs it reports the
+    modules finished so far, then the full plan. Cached plans are returned
+    inline (200). No request worker is held while the plan is generated.
+    """
     if 'user_id' not in session:
         return jsonify({"status": "error", "message": "Authentication required."}), 401
     data = request.get_json()
-    plan_data = generate_structured_plan_from_gemini(
-        data.get("topic"), data.get("difficulty"), int(data.get("timeline"))
-    )
-    if plan_data:
-        return jsonify({ "status": "success", "plan_data": plan_data }), 200
-    else:
-        return jsonify({"status": "error", "message": "Failed to generate plan from AI."}), 500
+    try:
+        topic, difficulty, timeline = data.get("topic"), data.get("difficulty"), int(data.get("timeline"))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Topic, difficulty and a numeric timeline are required."}), 400
+
+    cached_plan = plan_cache.get(plan_cache_key(topic, difficulty, timeline))
+    if cached_plan:
+        return jsonify({ "status": "success", "plan_data": cached_plan, "from_cache": True }), 200
+
+    try:
+        job_id = plan_jobs.submit(_run_plan_generation_job, topic, difficulty, timeline,
+                                  owner=session['user_id'], report_progress=True)
+    except QueueFullError:
+        return _plan_queue_full_response()
+
+    return jsonify({
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": url_for('start_plan.generate_plan_status', job_id=job_id)
+    }), 202
+
+@start_plan_bp.route('/generate_plan/jobs/<string:job_id>', methods=['GET'])
+def generate_plan_status(job_id):
+    """Reports a plan generation job as queued / running (with the modules so far) / done (with plan_data) / failed."""
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Authentication required."}), 401
+
+    job = plan_jobs.get(job_id)
+    if not job or job['owner'] != session['user_id']:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+
+    if job['state'] == JOB_DONE:
+        return jsonify({ "status": "success", "job_state": job['state'], "plan_data": job['result'] }), 200
+    if job['state'] == JOB_FAILED:
+        return jsonify({"status": "error", "job_state": job['state'], "message": "Failed to generate plan from AI."}), 500
+    return jsonify({
+        "status": "pending",
+        "job_state": job['state'],
+        "progress": job['progress'],
+        "queue_depth": plan_jobs.depth()
+    }), 200
+
+@start_plan_bp.route('/generate_plan/cache-stats', methods=['GET'])
+def plan_cache_stats():
+    """Hit/miss counters for the generated-plan cache."""
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Authentication required."}), 401
+    return jsonify({"status": "success", "stats": plan_cache.stats()}), 200
 
 @start_plan_bp.route('/save_plan', methods=['POST'])
 def save_plan():
@@ -141,20 +177,40 @@ def save_plan():
             'difficulty_level': plan_data.get('difficulty_level'),
             'total_duration_months': plan_data.get('total_duration_months'),
             'creation_date': firestore.SERVER_TIMESTAMP,
-            'status': 'active'
+            'last_updated': firestore.SERVER_TIMESTAMP,
+            'status': 'active',
+            LESSONS_KEYED_FLAG: True,
+            'completed_lessons': 0,
+            'total_lessons': sum(len(module.get('lessons', [])) for module in plan_data.get('modules', [])),
+            'progress': 0
         }
-        update_time, plan_ref = db.collection('plans').add(plan_to_save)
+        # Document IDs are allocated client-side, so modules and lessons can reference
+        # their parents without waiting for a round trip; everything is written in
+        # chunked batches (one commit per 500 documents).
+        plan_ref = db.collection('plans').document()
         plan_id = plan_ref.id
 
-        for module in plan_data.get('modules', []):
-            module_to_save = { 'planId': plan_id, 'module_number': module.get('module_number'), 'module_title': module.get('module_title') }
-            update_time, module_ref = db.collection('modules').add(module_to_save)
-            module_id = module_ref.id
-
-            for lesson in module.get('lessons', []):
-                lesson_to_save = { 'moduleId': module_id, **lesson }
-                lesson_to_save.pop('Youtube_keywords', None)
-                db.collection('lessons').add(lesson_to_save)
+        with ChunkedBatchWriter(db) as writer:
+            for module in plan_data.get('modules', []):
+                module_ref = db.collection('modules').document()
+                module_to_save = { 'planId': plan_id, 'module_number': module.get('module_number'), 'module_title': module.get('module_title') }
+                writer.set(module_ref, module_to_save)
+
+                for lesson in module.get('lessons', []):
+                    lesson_to_save = { 'moduleId': module_ref.id, 'planId': plan_id, **lesson }
+                    lesson_to_save.pop('Youtube_keywords', None)
+                    writer.set(db.collection('lessons').document(), lesson_to_save)
+
+            # The plan document goes in the last chunk so a partially failed save
+            # never shows up in the user's course list.
+            writer.set(plan_ref, plan_to_save)
+
+        # Best-effort and outside the batch: a failed counter update can't fail the save.
+        popularity_index.record_plan_created(plan_to_save['plan_title'])
+        similarity_index.add_plan(
+            user_id, plan_id, plan_to_save['plan_title'],
+            [lesson.get('topic', '') for module in plan_data.get('modules', []) for lesson in module.get('lessons', [])]
+        )
         
         return jsonify({"status": "success", "plan_id": plan_id}), 200
     except Exception as e:
@@ -168,29 +224,4 @@ def recommend_plan():
     This feature recommends learning plans based on the most popular
     courses created by other users.
     """
-    # Ensure user is logged in
-    if 'user_id' not in session:
-        return jsonify({"status": "error", "message": "Authentication required."}), 401
-    
-    try:
-        # Get all documents from the 'plans' collection
-        plans_ref = db.collection('plans').stream()
-        
-        # Create a list of all plan titles, filtering out any that are empty
-        all_titles = [plan.to_dict().get('plan_title') for plan in plans_ref if plan.to_dict().get('plan_title')]
-        
-        # If there are no titles, return an empty list
-        if not all_titles:
-            return jsonify({"status": "success", "recommendations": []})
-            
-        # Use Counter to find the 5 most common plan titles
-        title_counts = Counter(all_titles)
-        most_common_titles = [title for title, count in title_counts.most_common(5)]
-        
-        # Return the list of recommendations
-        return jsonify({"status": "success", "recommendations": most_common_titles}), 200
-        
-    except Exception as e:
-        # Log the error for debugging and return a generic error message
-        print(f"Recommendation Logic Error: {e}")
-        return jsonify({"status": "error", "message": "An error occurred while fetching recommendations."}), 500
+    return _popular_plans_response()
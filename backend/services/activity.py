@@ -0,0 +1,195 @@
+# backend/services/activity.py
+
+import math
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.course_tree import LESSONS_KEYED_FLAG
+from backend.services.plan_progress import COUNTER_FIELDS, plan_counters
+from backend.services.queries import project
+
+# --- Configuration ---
+PROGRESS_COLLECTION = 'user_progress'
+LEDGER_SUBCOLLECTION = 'activity'
+LESSON_XP = int(os.environ.get("LESSON_XP", 50))
+QUIZ_BASE_XP = int(os.environ.get("QUIZ_BASE_XP", 10))
+# XP needed for level n is LEVEL_XP_STEP * (n - 1)^2.
+LEVEL_XP_STEP = int(os.environ.get("LEVEL_XP_STEP", 100))
+
+EVENT_LESSON_COMPLETED = 'lesson_completed'
+EVENT_LESSON_UNCOMPLETED = 'lesson_uncompleted'
+EVENT_QUIZ_SUBMITTED = 'quiz_submitted'
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def _progress_ref(user_id: str):
+    return db.collection(PROGRESS_COLLECTION).document(user_id)
+
+
+def level_for_xp(xp: int) -> int:
+    return 1 + math.isqrt(max(xp, 0) // LEVEL_XP_STEP)
+
+
+def quiz_xp(score, total) -> int:
+    """Base XP plus up to 10 more for the score percentage."""
+    percent = round(((score or 0) / (total or 1)) * 100)
+    return QUIZ_BASE_XP + max(0, min(percent, 100)) // 10
+
+
+def apply_event(progress: dict, event_type: str, xp: int, day: date) -> dict:
+    """The counters after one event. Undoing a lesson takes its XP and topic back but isn't activity."""
+    xp_total = max(progress.get('xp', 0) + xp, 0)
+    completed = progress.get('completed_topics', 0)
+    if event_type == EVENT_LESSON_COMPLETED:
+        completed += 1
+    elif event_type == EVENT_LESSON_UNCOMPLETED:
+        completed = max(completed - 1, 0)
+
+    current, longest = progress.get('current_streak', 0), progress.get('longest_streak', 0)
+    last_day = progress.get('last_active_day')
+    if event_type != EVENT_LESSON_UNCOMPLETED:
+        day_str = day.isoformat()
+        if last_day != day_str:
+            current = current + 1 if last_day == (day - timedelta(days=1)).isoformat() else 1
+            last_day = day_str
+        longest = max(longest, current)
+
+    return {
+        'xp': xp_total,
+        'level': level_for_xp(xp_total),
+        'completed_topics': completed,
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_active_day': last_day,
+        'events': progress.get('events', 0) + 1
+    }
+
+
+def record_activity(user_id: str, event_type: str, xp: int = 0, ref: str | None = None) -> dict:
+    """
+    Appends an event to users/<uid>/activity and folds it into the user's
+    counters document in the same transaction, so the ledger and counters
+    never disagree. Returns the new counters.
+    """
+    progress_ref = _progress_ref(user_id)
+    event_ref = db.collection('users').document(user_id).collection(LEDGER_SUBCOLLECTION).document()
+    day = _today()
+
+    # Users who predate the ledger get counters rebuilt from their plans and
+    # attempts, which already include this event; it's only logged, not folded.
+    fold = progress_ref.get().exists
+    if not fold:
+        rebuild_user_progress(user_id, active_days=() if event_type == EVENT_LESSON_UNCOMPLETED else (day,))
+
+    @firestore.transactional
+    def append(transaction):
+        doc = progress_ref.get(transaction=transaction)
+        progress = doc.to_dict() if doc.exists else {}
+        if fold:
+            progress = apply_event(progress, event_type, xp, day)
+        progress.pop('updated_at', None)
+        transaction.create(event_ref, {
+            'type': event_type,
+            'xp': xp,
+            'ref': ref,
+            'day': day.isoformat(),
+            'at': firestore.SERVER_TIMESTAMP
+        })
+        transaction.set(progress_ref, {**progress, 'updated_at': firestore.SERVER_TIMESTAMP})
+        return progress
+
+    return append(db.transaction())
+
+
+def record_lesson_completion(user_id: str, lesson_id: str, is_completed: bool) -> dict:
+    if is_completed:
+        return record_activity(user_id, EVENT_LESSON_COMPLETED, LESSON_XP, lesson_id)
+    return record_activity(user_id, EVENT_LESSON_UNCOMPLETED, -LESSON_XP, lesson_id)
+
+
+def record_quiz_submission(user_id: str, lesson_id: str, score, total) -> dict:
+    return record_activity(user_id, EVENT_QUIZ_SUBMITTED, quiz_xp(score, total), lesson_id)
+
+
+# ----------------------------- READS -----------------------------
+
+def dashboard_progress(progress: dict) -> dict:
+    """Counters as shown on the dashboard; a streak whose last day is before yesterday has lapsed."""
+    last_day = progress.get('last_active_day')
+    recent = {_today().isoformat(), (_today() - timedelta(days=1)).isoformat()}
+    return {
+        'xp_points': progress.get('xp', 0),
+        'level': progress.get('level', 1),
+        'day_streak': progress.get('current_streak', 0) if last_day in recent else 0,
+        'longest_streak': progress.get('longest_streak', 0),
+        'completed_topics_count': progress.get('completed_topics', 0)
+    }
+
+
+def user_progress(user_id: str) -> dict:
+    """The user's counters document (one read); built once from existing data for users who predate it."""
+    doc = _progress_ref(user_id).get()
+    if doc.exists:
+        return doc.to_dict()
+    return rebuild_user_progress(user_id)
+
+
+# ----------------------------- BACKFILL -----------------------------
+
+def rebuild_user_progress(user_id: str, active_days=()) -> dict:
+    """
+    Backfill for users with activity from before the ledger: completed lessons
+    come from the plans' counters and quiz XP/active days from quiz_attempts.
+    The ledger itself starts empty; only the counters are reconstructed.
+    """
+    completed = 0
+    plans = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id))
+    for plan in project(plans, [LESSONS_KEYED_FLAG, *COUNTER_FIELDS]):
+        completed += plan_counters(plan.id, plan.to_dict())['completed_lessons']
+
+    xp, days = completed * LESSON_XP, set(active_days)
+    for attempt in db.collection('quiz_attempts').where(
+        filter=FieldFilter('userId', '==', user_id)
+    ).select(['score', 'total', 'submitted_at']).stream():
+        data = attempt.to_dict()
+        xp += quiz_xp(data.get('score'), data.get('total'))
+        if data.get('submitted_at'):
+            days.add(data['submitted_at'].date())
+
+    current, longest, previous = 0, 0, None
+    for day in sorted(days):
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest, previous = max(longest, current), day
+
+    progress = {
+        'xp': xp,
+        'level': level_for_xp(xp),
+        'completed_topics': completed,
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_active_day': previous.isoformat() if previous else None,
+        'events': 0
+    }
+    _progress_ref(user_id).set({**progress, 'updated_at': firestore.SERVER_TIMESTAMP})
+    return progress
+
+
+def rebuild_all_user_progress():
+    """Builds counters for every user who doesn't have them yet (ledger-maintained counters are left alone)."""
+    count = 0
+    for user in db.collection('users').select([]).stream():
+        if not _progress_ref(user.id).get().exists:
+            rebuild_user_progress(user.id)
+            count += 1
+    print(f"User progress built for {count} users.")
+
+
+if __name__ == '__main__':
+    rebuild_all_user_progress()
@@ -0,0 +1,175 @@
+# backend/services/cascade_delete.py
+
+import os
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.activity import LEDGER_SUBCOLLECTION, PROGRESS_COLLECTION
+from backend.services.course_tree import LESSONS_KEYED_FLAG
+from backend.services.course_view_cache import course_view_cache
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.job_queue import JobQueue, QueueFullError
+from backend.services.popularity import popularity_index
+from backend.services.queries import ids, project, refs, where_in
+from backend.services.quiz_aggregates import remove_user
+from backend.services.similarity_index import similarity_index
+
+# --- Configuration ---
+# Deletes run on a small local pool so the HTTP request returns right away.
+delete_jobs = JobQueue(
+    'cascade_delete',
+    max_workers=int(os.environ.get("DELETE_JOB_WORKERS", 2)),
+    max_pending=int(os.environ.get("DELETE_JOB_MAX_PENDING", 32))
+)
+
+PLAN_FIELDS = ['plan_title', LESSONS_KEYED_FLAG]
+# Set on a user document while its account deletion is outstanding; the
+# document itself is deleted last, so the marker survives restarts and failures.
+DELETION_PENDING_FIELD = 'deletion_pending'
+
+
+def _no_progress(progress: dict):
+    pass
+
+
+# ----------------------------- COLLECTING -----------------------------
+
+def _plan_refs(plans: dict) -> list:
+    """
+    Every document under the given plans ({plan_id: plan data}) in delete
+    order: lessons, notes, modules. Ids only, with 'in' filters chunked to
+    Firestore's limit so any number of plans works.
+    """
+    plan_ids = list(plans)
+    modules = [
+        module for query in where_in(db.collection('modules'), 'planId', plan_ids)
+        for module in project(query, ['planId'])
+    ]
+
+    lessons = {ref.path: ref for query in where_in(db.collection('lessons'), 'planId', plan_ids) for ref in refs(query)}
+    # Plans saved before lessons carried planId are found through their modules.
+    legacy_module_ids = [
+        module.id for module in modules
+        if not plans.get(module.to_dict().get('planId'), {}).get(LESSONS_KEYED_FLAG)
+    ]
+    for query in where_in(db.collection('lessons'), 'moduleId', legacy_module_ids):
+        lessons.update((ref.path, ref) for ref in refs(query))
+
+    notes = [ref for query in where_in(db.collection('notes'), 'planId', plan_ids) for ref in refs(query)]
+    return [*lessons.values(), *notes, *(module.reference for module in modules)]
+
+
+def _account_refs(user_id: str) -> list:
+    """The user's own documents outside their plans: notes, quiz attempts, activity ledger, counters."""
+    by_user = [
+        *refs(db.collection('notes').where(filter=FieldFilter('userId', '==', user_id))),
+        *refs(db.collection('quiz_attempts').where(filter=FieldFilter('userId', '==', user_id))),
+        *refs(db.collection('users').document(user_id).collection(LEDGER_SUBCOLLECTION)),
+    ]
+    return [*by_user, db.collection(PROGRESS_COLLECTION).document(user_id)]
+
+
+# ----------------------------- DELETING -----------------------------
+
+def _delete_all(writer: ChunkedBatchWriter, doc_refs: list, progress, state: dict):
+    for ref in doc_refs:
+        committed = writer.committed_operations
+        writer.delete(ref)
+        if writer.committed_operations != committed:
+            progress({**state, 'deleted': writer.committed_operations})
+
+
+def delete_plans(plans: dict, extra_refs: list | None = None, progress=_no_progress) -> dict:
+    """
+    Cascading delete of `plans` ({plan_id: plan data with plan_title}) and
+    everything under them, plus any `extra_refs`, in 500-operation write
+    batches. Plan documents go last, so a job that fails part way leaves the
+    plans visible and safe to delete again. Returns {'plans', 'deleted'}.
+    """
+    # Keyed by path: a note can match both its plan and its user.
+    doc_refs = list({ref.path: ref for ref in [*_plan_refs(plans), *(extra_refs or [])]}.values())
+    state = {'phase': 'deleting', 'total': len(doc_refs) + len(plans), 'deleted': 0}
+    progress(state)
+
+    with ChunkedBatchWriter(db) as writer:
+        _delete_all(writer, doc_refs, progress, state)
+        for plan_id in plans:
+            writer.delete(db.collection('plans').document(plan_id))
+    deleted = state['total']
+
+    for plan_id, plan_data in plans.items():
+        popularity_index.record_plan_deleted(plan_data.get('plan_title'))
+        course_view_cache.invalidate(plan_id)
+        similarity_index.remove_plan(plan_id)
+    progress({**state, 'phase': 'done', 'deleted': deleted})
+    return {'plans': len(plans), 'deleted': deleted}
+
+
+def user_plans(user_id: str) -> dict:
+    plans_query = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id))
+    return {plan.id: plan.to_dict() for plan in project(plans_query, PLAN_FIELDS)}
+
+
+def delete_all_user_plans(user_id: str, progress=_no_progress) -> dict:
+    return delete_plans(user_plans(user_id), progress=progress)
+
+
+def delete_account_data(user_id: str, progress=_no_progress) -> dict:
+    """
+    Everything a user owns: plans and their contents, notes, quiz attempts,
+    quiz aggregate and progress, then the user document itself. Safe to run
+    again after a partial failure.
+    """
+    result = delete_plans(user_plans(user_id), extra_refs=_account_refs(user_id), progress=progress)
+    remove_user(user_id)
+    db.collection('users').document(user_id).delete()
+    return result
+
+
+# ----------------------------- JOBS -----------------------------
+
+def submit_plan_deletion(user_id: str, plans: dict) -> str:
+    """Queues a cascading delete; raises QueueFullError when the queue is full."""
+    return delete_jobs.submit(delete_plans, plans, owner=user_id, report_progress=True)
+
+
+def submit_all_plans_deletion(user_id: str) -> str:
+    return delete_jobs.submit(delete_all_user_plans, user_id, owner=user_id, report_progress=True)
+
+
+def request_account_deletion(user_id: str):
+    """
+    Marks the account as pending deletion, then queues the cascade. The
+    marker is durable: if the queue is full, the process restarts or the job
+    fails, sweep_pending_account_deletions() finishes the job later.
+    """
+    db.collection('users').document(user_id).update({
+        DELETION_PENDING_FIELD: True,
+        'deletion_requested_at': firestore.SERVER_TIMESTAMP
+    })
+    try:
+        delete_jobs.submit(delete_account_data, user_id, owner=user_id)
+    except QueueFullError:
+        print(f"Delete queue full; account {user_id} left for the deletion sweep.")
+
+
+def sweep_pending_account_deletions() -> int:
+    """Repair: finishes every account deletion still marked as pending. Returns how many were run."""
+    pending = db.collection('users').where(filter=FieldFilter(DELETION_PENDING_FIELD, '==', True))
+    swept = 0
+    for user_id in ids(pending):
+        try:
+            delete_account_data(user_id)
+            swept += 1
+        except Exception as e:
+            print(f"Account deletion sweep failed for {user_id}: {e}")
+    return swept
+
+
+if __name__ == '__main__':
+    # Schedule this (e.g. hourly) to finish deletions interrupted by a restart or failure:
+    #   python -m backend.services.cascade_delete
+    print(f"Pending account deletions finished: {sweep_pending_account_deletions()}.")
+
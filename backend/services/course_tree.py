@@ -0,0 +1,104 @@
+# backend/services/course_tree.py
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.queries import IN_QUERY_LIMIT, ids, project
+
+# --- Configuration ---
+# Set on plans whose lessons all carry `planId` (new saves and backfilled plans).
+LESSONS_KEYED_FLAG = 'lessons_keyed_by_plan'
+
+
+def _chunks(items: list, size: int = IN_QUERY_LIMIT):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _stream(query, fields: list | None):
+    return query.stream() if fields is None else project(query, fields)
+
+
+def _lessons_by_module_ids(module_ids: list, fields: list | None = None):
+    """Legacy path for lessons saved before they carried `planId`."""
+    for chunk in _chunks(module_ids):
+        yield from _stream(db.collection('lessons').where(filter=FieldFilter('moduleId', 'in', chunk)), fields)
+
+
+def load_course_tree(plan_id: str, plan_data: dict | None = None,
+                     lesson_fields: list | None = None) -> tuple[list, list]:
+    """
+    Loads a plan's modules with their lessons in two queries (modules by
+    planId, lessons by planId) and groups them in memory.
+
+    Returns (modules, lessons): modules ordered by module_number, each with
+    'id' and 'lessons' (ordered by day_of_plan); lessons is the same lesson
+    dicts flattened in course order. Plans that predate `planId` on lessons
+    fall back to chunked `moduleId in [...]` queries for modules that came
+    back empty.
+
+    With `lesson_fields`, only those lesson fields (plus the ones needed for
+    grouping and ordering) are fetched and modules carry just their number;
+    for callers that count or scan lessons rather than render them.
+    """
+    module_fields = None
+    if lesson_fields is not None:
+        lesson_fields = list(dict.fromkeys([*lesson_fields, 'moduleId', 'day_of_plan']))
+        module_fields = ['module_number']
+
+    modules = []
+    modules_query = db.collection('modules').where(filter=FieldFilter('planId', '==', plan_id)).order_by('module_number')
+    for module in _stream(modules_query, module_fields):
+        module_data = module.to_dict()
+        module_data['id'] = module.id
+        module_data['lessons'] = []
+        modules.append(module_data)
+    by_module = {module['id']: module for module in modules}
+
+    def add(lesson):
+        lesson_data = lesson.to_dict()
+        lesson_data['id'] = lesson.id
+        module = by_module.get(lesson_data.get('moduleId'))
+        if module is not None:
+            module['lessons'].append(lesson_data)
+
+    for lesson in _stream(db.collection('lessons').where(filter=FieldFilter('planId', '==', plan_id)), lesson_fields):
+        add(lesson)
+
+    if not (plan_data or {}).get(LESSONS_KEYED_FLAG):
+        missing = [module['id'] for module in modules if not module['lessons']]
+        for lesson in _lessons_by_module_ids(missing, lesson_fields):
+            add(lesson)
+
+    lessons = []
+    for module in modules:
+        module['lessons'].sort(key=lambda lesson: lesson.get('day_of_plan', 0))
+        lessons.extend(module['lessons'])
+    return modules, lessons
+
+
+def backfill_lesson_plan_ids():
+    """
+    Migration: stamps `planId` on every lesson of plans saved before lessons
+    carried it, then flags the plan so course loads skip the legacy path.
+    Safe to re-run; already-flagged plans are skipped.
+    """
+    plans_done, lessons_done = 0, 0
+    with ChunkedBatchWriter(db) as writer:
+        for plan in project(db.collection('plans'), [LESSONS_KEYED_FLAG]):
+            if plan.to_dict().get(LESSONS_KEYED_FLAG):
+                continue
+            module_ids = ids(db.collection('modules').where(filter=FieldFilter('planId', '==', plan.id)))
+            for lesson in _lessons_by_module_ids(module_ids, ['planId']):
+                if lesson.to_dict().get('planId') != plan.id:
+                    writer.update(lesson.reference, {'planId': plan.id})
+                    lessons_done += 1
+            # Same writer, so the flag is committed after the lessons it vouches for.
+            writer.update(plan.reference, {LESSONS_KEYED_FLAG: True})
+            plans_done += 1
+    print(f"Lesson planId backfill: {lessons_done} lessons across {plans_done} plans.")
+
+
+if __name__ == '__main__':
+    backfill_lesson_plan_ids()
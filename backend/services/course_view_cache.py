@@ -0,0 +1,123 @@
+# backend/services/course_view_cache.py
+
+import copy
+import os
+import threading
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.cache import TTLCache
+from backend.services.course_tree import load_course_tree
+from backend.services.plan_progress import plan_counters
+
+# --- Configuration ---
+COURSE_VIEW_CACHE_ENTRIES = int(os.environ.get("COURSE_VIEW_CACHE_ENTRIES", 512))
+# Bounds staleness across worker processes; writes in this process invalidate immediately.
+COURSE_VIEW_CACHE_TTL_SECONDS = int(os.environ.get("COURSE_VIEW_CACHE_TTL_SECONDS", 600))
+
+
+def build_course_view(plan_id: str, plan_data: dict) -> dict:
+    """Assembles plan -> modules -> lessons plus the plan's notes (each tagged with its lesson topic)."""
+    modules, lessons = load_course_tree(plan_id, plan_data)
+    plan_data = {**plan_data, **plan_counters(plan_id, plan_data, lessons)}
+
+    # Lesson id -> topic index instead of scanning every lesson for every note.
+    topics = {lesson['id']: lesson.get('topic') for lesson in lessons}
+    notes = []
+    for note in db.collection('notes').where(
+        filter=FieldFilter('planId', '==', plan_id)
+    ).order_by('created_at', direction=firestore.Query.DESCENDING).stream():
+        note_data = note.to_dict()
+        note_data['id'] = note.id
+        if note_data.get('lessonId') in topics:
+            note_data['topic'] = topics[note_data['lessonId']]
+        notes.append(note_data)
+
+    return {'plan': plan_data, 'modules': modules, 'lessons': lessons, 'notes': notes}
+
+
+class CourseViewCache:
+    """
+    Read-through cache of assembled course views, one entry per plan.
+
+    Every write that changes what a course page shows (lesson completion,
+    status, video links, notes, deletion) calls `invalidate*`/`mark_changed`,
+    which bumps the plan's version; a view built while a write raced it is
+    returned to its caller but not stored, so the cache never keeps a
+    pre-write view. `mark_changed` also moves the plan's `last_updated`, so
+    callers that pass a fresh plan snapshot to `get` detect changes made by
+    other processes too. Callers get deep copies and may mutate them freely.
+    """
+
+    def __init__(self, max_size: int = COURSE_VIEW_CACHE_ENTRIES, ttl_seconds: int = COURSE_VIEW_CACHE_TTL_SECONDS):
+        self._views = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        # lesson id -> plan id for the lessons of cached views, so lesson writes find their plan for free.
+        self._lesson_plans = TTLCache(max_size=max_size * 200, ttl_seconds=ttl_seconds)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, plan_id: str) -> int:
+        with self._lock:
+            return self._versions.get(plan_id, 0)
+
+    def get(self, plan_id: str, user_id: str, plan_data: dict | None = None) -> dict | None:
+        """
+        The course view for `plan_id`, or None if it doesn't exist or isn't
+        `user_id`'s. If the caller already read the plan document, passing it
+        as `plan_data` skips that read and discards a cached view whose
+        `last_updated` no longer matches.
+        """
+        view = self._views.get(plan_id)
+        if view is not None and plan_data is not None and view['plan'].get('last_updated') != plan_data.get('last_updated'):
+            view = None
+        if view is None:
+            version = self.version(plan_id)
+            if plan_data is None:
+                plan_doc = db.collection('plans').document(plan_id).get()
+                if not plan_doc.exists:
+                    return None
+                plan_data = plan_doc.to_dict()
+            view = build_course_view(plan_id, plan_data)
+            with self._lock:
+                if self._versions.get(plan_id, 0) == version:
+                    self._views.set(plan_id, view)
+                    for lesson in view['lessons']:
+                        self._lesson_plans.set(lesson['id'], plan_id)
+
+        if view['plan'].get('userId') != user_id:
+            return None
+        return copy.deepcopy(view)
+
+    def invalidate(self, plan_id: str | None):
+        if not plan_id:
+            return
+        with self._lock:
+            self._versions[plan_id] = self._versions.get(plan_id, 0) + 1
+            self._views.pop(plan_id)
+
+    def mark_changed(self, plan_id: str | None):
+        """Invalidates the plan's view and moves its `last_updated` (the plan's version stamp)."""
+        if not plan_id:
+            return
+        self.invalidate(plan_id)
+        db.collection('plans').document(plan_id).update({'last_updated': firestore.SERVER_TIMESTAMP})
+
+    def invalidate_lesson(self, lesson_id: str, plan_id: str | None = None):
+        """Marks the plan containing a lesson as changed; looks the plan up only if it isn't known."""
+        plan_id = plan_id or self._lesson_plans.get(lesson_id)
+        if not plan_id:
+            lesson_doc = db.collection('lessons').document(lesson_id).get(field_paths=['planId', 'moduleId'])
+            lesson_data = lesson_doc.to_dict() if lesson_doc.exists else {}
+            plan_id = lesson_data.get('planId')
+            if not plan_id and lesson_data.get('moduleId'):
+                module_doc = db.collection('modules').document(lesson_data['moduleId']).get(field_paths=['planId'])
+                plan_id = module_doc.to_dict().get('planId') if module_doc.exists else None
+        self.mark_changed(plan_id)
+
+    def stats(self) -> dict:
+        return self._views.stats()
+
+
+course_view_cache = CourseViewCache()
@@ -0,0 +1,61 @@
+# backend/services/firestore_batch.py
+
+# Firestore rejects write batches with more than 500 operations.
+MAX_BATCH_OPERATIONS = 500
+
+
+class ChunkedBatchWriter:
+    """
+    Queues Firestore writes and commits them in write batches of at most
+    `chunk_size` operations.
+
+    Each chunk is committed atomically; a plan of any size costs
+    ceil(operations / 500) commit RPCs instead of one RPC per document.
+    Use as a context manager so the final partial chunk is always flushed:
+
+        with ChunkedBatchWriter(db) as writer:
+            writer.set(ref, data)
+    """
+
+    def __init__(self, db, chunk_size: int = MAX_BATCH_OPERATIONS):
+        self.db = db
+        self.chunk_size = min(chunk_size, MAX_BATCH_OPERATIONS)
+        self._batch = None
+        self._pending = 0
+        self.committed_operations = 0
+        self.commits = 0
+
+    def _add(self, method: str, *args, **kwargs):
+        if self._batch is None:
+            self._batch = self.db.batch()
+        getattr(self._batch, method)(*args, **kwargs)
+        self._pending += 1
+        if self._pending >= self.chunk_size:
+            self.flush()
+
+    def set(self, ref, data: dict, merge: bool = False):
+        self._add('set', ref, data, merge=merge)
+
+    def update(self, ref, data: dict):
+        self._add('update', ref, data)
+
+    def delete(self, ref):
+        self._add('delete', ref)
+
+    def flush(self):
+        """Commits the current chunk, if any operations are queued."""
+        if self._batch is not None and self._pending:
+            self._batch.commit()
+            self.committed_operations += self._pending
+            self.commits += 1
+        self._batch = None
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Don't commit a half-built chunk if the caller failed part way through.
+        if exc_type is None:
+            self.flush()
+        return False
@@ -0,0 +1,89 @@
+# backend/services/http_cache.py
+
+import gzip
+import hashlib
+import os
+
+from flask import Response, jsonify, request
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.queries import count, project
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # brotli is optional; gzip is always available
+
+# --- Configuration ---
+# Bodies smaller than this aren't worth the CPU (and often grow when compressed).
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+
+# ----------------------------- VERSION STAMPS -----------------------------
+
+def make_etag(*parts) -> str:
+    """Opaque ETag value for a resource version made of the given parts."""
+    raw = "\x1f".join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def plan_version(plan_data: dict) -> tuple:
+    # Every write that changes a course view moves the plan's last_updated.
+    return (plan_data.get('last_updated') or plan_data.get('creation_date'), plan_data.get('progress'))
+
+
+def plan_list_version(user_id: str) -> tuple:
+    """
+    Version of a user's plan list: (number of plans, newest last_updated).
+    Two small queries (an aggregation and a limit-1 read) instead of reading
+    every plan. Creating or deleting a plan changes the count, and any plan
+    write moves the newest last_updated.
+    """
+    plans = db.collection('plans').where(filter=FieldFilter('userId', '==', user_id))
+    latest = list(project(plans.order_by('last_updated', direction='DESCENDING').limit(1), ['last_updated']))
+    return count(plans), latest[0].to_dict().get('last_updated') if latest else None
+
+
+# ----------------------------- RESPONSES -----------------------------
+
+def _cache_headers(response: Response, etag: str | None) -> Response:
+    if etag:
+        # Weak: the gzip and brotli variants of one version share the tag.
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def not_modified(etag: str) -> Response | None:
+    """A bodiless 304 if the client's If-None-Match already names this version, else None."""
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        return _cache_headers(Response(status=304), etag)
+    return None
+
+
+def negotiate_encoding() -> str | None:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def json_response(payload: dict, etag: str | None = None, status: int = 200) -> Response:
+    """jsonify() plus an ETag and gzip/brotli compression for bodies above COMPRESS_MIN_BYTES."""
+    response = _cache_headers(jsonify(payload), etag)
+    response.status_code = status
+    data = response.get_data()
+    encoding = negotiate_encoding() if len(data) >= COMPRESS_MIN_BYTES else None
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,141 @@
+# backend/services/job_queue.py
+
+import functools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when admission control rejects a new job."""
+
+
+# ----------------------------- JOB STORES -----------------------------
+
+class JobStore:
+    """
+    Storage backend for job records. Subclass this to keep jobs somewhere
+    shared (Firestore, Redis, ...) when running more than one node.
+    A job record is a plain dict with at least id, kind, owner, state.
+    """
+
+    def create(self, job: dict):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def count_active(self, kind: str | None = None) -> int:
+        """Number of queued or running jobs (optionally of one kind)."""
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store for single-node deployments and tests."""
+
+    def __init__(self, finished_ttl_seconds: int = 3600):
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._purge_finished()
+            self._jobs[job['id']] = dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def count_active(self, kind: str | None = None) -> int:
+        with self._lock:
+            return sum(
+                1 for job in self._jobs.values()
+                if job['state'] in (JOB_QUEUED, JOB_RUNNING) and (kind is None or job['kind'] == kind)
+            )
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.finished_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['state'] in (JOB_DONE, JOB_FAILED) and (job.get('finished_at') or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# ----------------------------- JOB QUEUE -----------------------------
+
+class JobQueue:
+    """
+    Runs jobs on a local worker pool and records their state in a JobStore.
+
+    `submit` returns a job ID immediately; request handlers poll the store
+    through `get`. New jobs are refused with QueueFullError once
+    `max_pending` jobs are queued or running, so a burst of requests can't
+    build an unbounded backlog. With `report_progress=True` the job function
+    also gets a `progress` callable that publishes a dict for status polls.
+    """
+
+    def __init__(self, kind: str, store: JobStore | None = None, max_workers: int = 4, max_pending: int = 32):
+        self.kind = kind
+        self.store = store or InMemoryJobStore()
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'job-{kind}')
+        self._admission_lock = threading.Lock()
+
+    def submit(self, fn, *args, owner: str | None = None, report_progress: bool = False, **kwargs) -> str:
+        with self._admission_lock:
+            if self.store.count_active(self.kind) >= self.max_pending:
+                raise QueueFullError(f"Too many pending {self.kind} jobs.")
+            job_id = uuid.uuid4().hex
+            self.store.create({
+                'id': job_id,
+                'kind': self.kind,
+                'owner': owner,
+                'state': JOB_QUEUED,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'progress': None,
+                'result': None,
+                'error': None
+            })
+        if report_progress:
+            kwargs['progress'] = functools.partial(self.set_progress, job_id)
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, fn, args, kwargs):
+        self.store.update(job_id, state=JOB_RUNNING, started_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+            self.store.update(job_id, state=JOB_DONE, result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"Job {self.kind}/{job_id} failed: {e}")
+            self.store.update(job_id, state=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    def get(self, job_id: str) -> dict | None:
+        return self.store.get(job_id)
+
+    def set_progress(self, job_id: str, progress: dict):
+        """Lets a running job publish intermediate progress for status polls."""
+        self.store.update(job_id, progress=progress)
+
+    def depth(self) -> int:
+        return self.store.count_active(self.kind)
@@ -0,0 +1,47 @@
+# backend/services/lesson_lookup.py
+
+import os
+
+from backend import db
+from backend.services.cache import TTLCache
+
+# --- Configuration ---
+LESSON_TOPIC_CACHE_ENTRIES = int(os.environ.get("LESSON_TOPIC_CACHE_ENTRIES", 20000))
+LESSON_TOPIC_CACHE_TTL_SECONDS = int(os.environ.get("LESSON_TOPIC_CACHE_TTL_SECONDS", 3600))
+# Documents per get_all round trip.
+GET_ALL_CHUNK = 100
+
+_topics = TTLCache(max_size=LESSON_TOPIC_CACHE_ENTRIES, ttl_seconds=LESSON_TOPIC_CACHE_TTL_SECONDS)
+_MISS = object()
+
+
+def lesson_topics(lesson_ids) -> dict:
+    """
+    {lesson_id: topic} for the given ids (deleted lessons map to None).
+
+    Ids are deduplicated, served from a per-process LRU where possible, and
+    the rest fetched with chunked get_all calls reading only the `topic`
+    field, so labelling a page of quiz history costs at most one round trip
+    per GET_ALL_CHUNK unseen lessons.
+    """
+    result, missing = {}, []
+    for lesson_id in dict.fromkeys(lesson_ids):
+        if not lesson_id:
+            continue
+        topic = _topics.get(lesson_id, _MISS)
+        if topic is _MISS:
+            missing.append(lesson_id)
+        else:
+            result[lesson_id] = topic
+
+    for i in range(0, len(missing), GET_ALL_CHUNK):
+        refs = [db.collection('lessons').document(lesson_id) for lesson_id in missing[i:i + GET_ALL_CHUNK]]
+        for doc in db.get_all(refs, field_paths=['topic']):
+            topic = doc.to_dict().get('topic') if doc.exists else None
+            _topics.set(doc.id, topic)
+            result[doc.id] = topic
+    return result
+
+
+def cache_stats() -> dict:
+    return _topics.stats()
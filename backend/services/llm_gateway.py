@@ -0,0 +1,195 @@
+# backend/services/llm_gateway.py
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from google import genai
+
+# --- Configuration ---
+DEFAULT_MODEL_ID = 'gemini-2.5-flash'
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+LLM_RATE_PER_SECOND = float(os.environ.get("LLM_RATE_PER_SECOND", 5))
+LLM_BURST = int(os.environ.get("LLM_BURST", 10))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE_SECONDS = float(os.environ.get("LLM_BACKOFF_BASE_SECONDS", 1.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.environ.get("LLM_BACKOFF_MAX_SECONDS", 30.0))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no API key is configured."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_code(error: Exception) -> int | None:
+    for attr in ('code', 'status_code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    code = _status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    # Connection resets / timeouts from the HTTP layer don't carry a status code.
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class LLMGateway:
+    """
+    Single entry point for every Gemini call in the app.
+
+    - One shared `genai.Client` (and its connection pool) per process.
+    - A global concurrency limit and a token-bucket rate limit across all callers.
+    - Retries with jittered exponential backoff on 429 / 5xx.
+    - Per-call latency and token counts, aggregated in `stats()`.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self._bucket = TokenBucket(LLM_RATE_PER_SECOND, LLM_BURST)
+        self._stats_lock = threading.Lock()
+        self._totals = {'calls': 0, 'errors': 0, 'retries': 0, 'prompt_tokens': 0,
+                        'output_tokens': 0, 'total_latency_ms': 0.0}
+        self.recent_calls = deque(maxlen=200)
+
+    # --- Client ---
+
+    def is_configured(self) -> bool:
+        return bool(os.environ.get("GOOGLE_API_KEY"))
+
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    api_key = os.environ.get("GOOGLE_API_KEY")
+                    if not api_key:
+                        raise LLMUnavailableError("GOOGLE_API_KEY is not configured.")
+                    self._client = genai.Client(api_key=api_key)
+        return self._client
+
+    # --- Metrics ---
+
+    def _record(self, model: str, started: float, response=None, error: Exception | None = None, retries: int = 0):
+        latency_ms = (time.monotonic() - started) * 1000
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or 0
+        output_tokens = getattr(usage, 'candidates_token_count', None) or 0
+        with self._stats_lock:
+            self._totals['calls'] += 1
+            self._totals['retries'] += retries
+            self._totals['errors'] += 1 if error else 0
+            self._totals['prompt_tokens'] += prompt_tokens
+            self._totals['output_tokens'] += output_tokens
+            self._totals['total_latency_ms'] += latency_ms
+            self.recent_calls.append({
+                'model': model,
+                'latency_ms': round(latency_ms, 1),
+                'prompt_tokens': prompt_tokens,
+                'output_tokens': output_tokens,
+                'retries': retries,
+                'error': str(error) if error else None
+            })
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            calls = self._totals['calls']
+            return {
+                **self._totals,
+                'avg_latency_ms': round(self._totals['total_latency_ms'] / calls, 1) if calls else 0.0
+            }
+
+    # --- Calls ---
+
+    def _backoff(self, attempt: int):
+        delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))  # full jitter
+
+    def _contents(self, prompt: str) -> list:
+        return [{"role": "user", "parts": [{"text": prompt}]}]
+
+    def generate_content(self, prompt: str, model: str = DEFAULT_MODEL_ID):
+        """Runs one generate_content call under the global limits and returns the raw response."""
+        client = self.client()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            try:
+                with self._slots:
+                    response = client.models.generate_content(model=model, contents=self._contents(prompt))
+                self._record(model, started, response=response, retries=attempt)
+                return response
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not is_retryable(e):
+                    self._record(model, started, error=e, retries=attempt)
+                    raise
+                self._backoff(attempt)
+                attempt += 1
+
+    def generate_text(self, prompt: str, model: str = DEFAULT_MODEL_ID) -> str:
+        return self.generate_content(prompt, model).text or ""
+
+    def generate_text_stream(self, prompt: str, model: str = DEFAULT_MODEL_ID):
+        """
+        Yields text chunks from the streaming API. The concurrency slot is held
+        for the whole stream; retries only happen before the first chunk arrives.
+        """
+        client = self.client()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            self._slots.acquire()
+            last_chunk = None
+            received_any = False
+            try:
+                for chunk in client.models.generate_content_stream(model=model, contents=self._contents(prompt)):
+                    received_any = True
+                    last_chunk = chunk
+                    yield chunk.text or ""
+                # The final chunk carries the usage metadata for the whole stream.
+                self._record(model, started, response=last_chunk, retries=attempt)
+                return
+            except Exception as e:
+                if received_any or attempt >= LLM_MAX_RETRIES or not is_retryable(e):
+                    self._record(model, started, error=e, retries=attempt)
+                    raise
+            finally:
+                self._slots.release()
+            self._backoff(attempt)
+            attempt += 1
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,131 @@
+# backend/services/local_quiz.py
+
+import random
+import re
+
+import numpy as np
+
+from backend.services.text_vectors import HashingEmbedder, tokenize
+
+# Words that make poor cloze answers even when they score well.
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each even every few for from further get gets getting go
+going gonna got had has have having he her here hers him his how i if in into is it its itself just know let
+like lot make many me might more most much must my need now of off okay on once one only or other our out over
+own really right same say see she should so some something such take than that the their them then there these
+they thing things think this those through to too um uh under until up us use used using very want was way we
+well were what when where which while who whom why will with would yeah yes you your actually basically going
+""".split())
+
+MIN_SENTENCE_WORDS = 8
+MAX_SENTENCE_WORDS = 45
+# Auto-generated captions often have no punctuation; fall back to fixed windows of this many words.
+CAPTION_WINDOW_WORDS = 22
+
+_embedder = HashingEmbedder(sif=False, char_weight=1.0)
+
+
+def split_sentences(text: str) -> list:
+    """Sentence segmentation by punctuation, falling back to word windows for unpunctuated captions."""
+    text = re.sub(r'\s+', ' ', (text or '').replace('\n', ' ')).strip()
+    if not text:
+        return []
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+(?=[A-Z0-9"\'])', text) if s.strip()]
+    if len(sentences) <= 1 and len(text.split()) > MAX_SENTENCE_WORDS:
+        words = text.split()
+        sentences = [" ".join(words[i:i + CAPTION_WINDOW_WORDS]) for i in range(0, len(words), CAPTION_WINDOW_WORDS)]
+    return [s for s in sentences if MIN_SENTENCE_WORDS <= len(s.split()) <= MAX_SENTENCE_WORDS]
+
+
+def _candidate_terms(sentence: str) -> set:
+    return {w for w in tokenize(sentence) if len(w) >= 4 and w not in STOPWORDS and not w.isdigit()}
+
+
+def key_terms(sentences: list, limit: int = 20) -> list:
+    """Ranks terms by TF-IDF with sentences as documents (tf over the whole text, idf across sentences)."""
+    sentence_terms = [_candidate_terms(s) for s in sentences]
+    vocabulary = sorted(set().union(*sentence_terms)) if sentence_terms else []
+    if not vocabulary:
+        return []
+    index = {term: i for i, term in enumerate(vocabulary)}
+
+    # Sentence x term incidence matrix; tf is taken from raw token counts.
+    incidence = np.zeros((len(sentences), len(vocabulary)), dtype=np.float32)
+    tf = np.zeros(len(vocabulary), dtype=np.float32)
+    for row, (sentence, terms) in enumerate(zip(sentences, sentence_terms)):
+        for term in terms:
+            incidence[row, index[term]] = 1.0
+        for token in tokenize(sentence):
+            if token in index:
+                tf[index[token]] += 1
+
+    df = incidence.sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1.0
+    # Terms that appear only once are usually noise in transcripts.
+    scores = np.log1p(tf) * idf * (tf > 1)
+    if not scores.any():
+        scores = np.log1p(tf) * idf
+    order = np.argsort(-scores)[:limit]
+    return [vocabulary[i] for i in order if scores[i] > 0]
+
+
+def _stem(term: str) -> str:
+    # Crude plural folding; enough to keep "tree" from being a distractor for "trees".
+    for suffix in ('ies', 'es', 's'):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[:-len(suffix)]
+    return term
+
+
+def _distractors(answer: str, pool: list, count: int = 3) -> list:
+    """Picks the pool terms most similar to the answer (one vectorized similarity pass)."""
+    stem = _stem(answer)
+    # One term per stem (the first, i.e. highest ranked), so options never repeat a word.
+    by_stem = {}
+    for term in pool:
+        by_stem.setdefault(_stem(term), term)
+    pool = [t for s, t in by_stem.items() if s != stem and answer not in t and t not in answer]
+    if not pool:
+        return []
+    matrix = _embedder.embed([answer, *pool])
+    similarities = matrix[1:] @ matrix[0]
+    return [pool[i] for i in np.argsort(-similarities)[:count]]
+
+
+def generate_cloze_quiz(text: str, num_questions: int = 5, seed: int | str | None = None) -> dict:
+    """
+    Builds fill-in-the-blank multiple-choice questions from plain text (e.g. a
+    cached transcript) with no model download: sentence segmentation, TF-IDF
+    key terms as answers, and the most similar other key terms as distractors.
+    Returns the same {"quiz": [{"question", "options", "answer"}]} shape as the LLM path.
+    """
+    rng = random.Random(seed)
+    sentences = split_sentences(text)
+    terms = key_terms(sentences)
+    if len(terms) < 2:
+        return {"quiz": []}
+
+    quiz, used_sentences = [], set()
+    for answer in terms:
+        if len(quiz) >= num_questions:
+            break
+        pattern = re.compile(rf'\b{re.escape(answer)}\b', re.IGNORECASE)
+        sentence_index = next(
+            (i for i, s in enumerate(sentences) if i not in used_sentences and pattern.search(s)), None
+        )
+        if sentence_index is None:
+            continue
+        distractors = _distractors(answer, terms)
+        if len(distractors) < 2:
+            continue
+        used_sentences.add(sentence_index)
+
+        options = distractors + [answer]
+        rng.shuffle(options)
+        quiz.append({
+            "question": pattern.sub("_______", sentences[sentence_index]),
+            "options": options,
+            "answer": answer
+        })
+    return {"quiz": quiz}
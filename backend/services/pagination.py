@@ -0,0 +1,57 @@
+# backend/services/pagination.py
+
+import base64
+import json
+import os
+
+# --- Configuration ---
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", 20))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed, or the document it points at no longer exists."""
+
+
+def encode_cursor(doc_id: str) -> str:
+    payload = json.dumps({'after': doc_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))['after']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(str(e)) from e
+
+
+def page_size_from(args, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """The `limit` query argument, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def fetch_page(query, collection, cursor: str | None = None, page_size: int = DEFAULT_PAGE_SIZE) -> tuple[list, str | None]:
+    """
+    One page of `query` (which must already carry its filters and order_by).
+
+    The cursor is an opaque token naming the last document of the previous
+    page; the next page starts after that document's snapshot, so ties in the
+    order field never skip or repeat documents. Reads page_size + 1 documents
+    (+1 for the cursor snapshot) whatever the total size, and returns
+    (snapshots, next_cursor) with next_cursor None on the last page.
+    """
+    if cursor:
+        after = collection.document(decode_cursor(cursor)).get()
+        if not after.exists:
+            raise InvalidCursorError('cursor document no longer exists')
+        query = query.start_after(after)
+
+    docs = list(query.limit(page_size + 1).stream())
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+    return docs, encode_cursor(docs[-1].id) if has_more else None
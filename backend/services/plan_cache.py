@@ -0,0 +1,184 @@
+# backend/services/plan_cache.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from backend.services.cache import TTLCache
+
+# --- Configuration ---
+PLAN_CACHE_TTL_SECONDS = int(os.environ.get("PLAN_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+PLAN_CACHE_MAX_ENTRIES = int(os.environ.get("PLAN_CACHE_MAX_ENTRIES", 256))
+PLAN_CACHE_PATH = os.environ.get(
+    "PLAN_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'plan_cache.sqlite3')
+)
+
+# Words that should map to the same cache entry. Applied token-by-token after casefolding.
+TOPIC_SYNONYMS = {
+    'js': 'javascript',
+    'ts': 'typescript',
+    'py': 'python',
+    'python3': 'python',
+    'golang': 'go',
+    'ml': 'machine learning',
+    'dl': 'deep learning',
+    'ai': 'artificial intelligence',
+    'nlp': 'natural language processing',
+    'dsa': 'data structures and algorithms',
+    'db': 'database',
+    'dbs': 'databases',
+    'k8s': 'kubernetes',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'nodejs': 'node',
+    'node.js': 'node',
+    '&': 'and',
+}
+
+DIFFICULTY_SYNONYMS = {
+    'basic': 'beginner',
+    'easy': 'beginner',
+    'novice': 'beginner',
+    'medium': 'intermediate',
+    'hard': 'advanced',
+    'expert': 'advanced',
+    'master': 'advanced',
+}
+
+# Filler words that don't change what plan gets generated.
+TOPIC_STOPWORDS = {'course', 'tutorial', 'the', 'a', 'an', 'to', 'of', 'in', 'for'}
+# Only filler at the start ("learn python"); "machine learning" must keep its last word
+# so it folds to the same key as "ml".
+TOPIC_LEADING_FILLER = {'learn', 'learning'}
+
+
+def _fold(text: str, synonyms: dict, stopwords: set = frozenset(), leading: set = frozenset()) -> str:
+    """
+    Casefolds, drops filler from the words as typed, then expands synonyms, so an
+    expansion ('ml' -> 'machine learning') is never trimmed by the filler rules.
+    """
+    tokens = [token.strip(',;:!?') for token in re.split(r'\s+', (text or '').casefold().strip())]
+    tokens = [token for token in tokens if token and token not in stopwords]
+    while tokens and tokens[0] in leading and len(tokens) > 1:
+        tokens.pop(0)
+    return ' '.join(synonyms.get(token, token) for token in tokens)
+
+
+def normalize_plan_request(topic: str, difficulty: str, timeline_months: int) -> tuple:
+    """Returns the canonical (topic, difficulty, timeline_months) triple used as the cache key."""
+    return (
+        _fold(topic, TOPIC_SYNONYMS, TOPIC_STOPWORDS, TOPIC_LEADING_FILLER),
+        _fold(difficulty, DIFFICULTY_SYNONYMS),
+        int(timeline_months)
+    )
+
+
+def plan_cache_key(topic: str, difficulty: str, timeline_months: int) -> str:
+    """Content address of a plan request: a SHA-256 of the normalized triple."""
+    normalized = normalize_plan_request(topic, difficulty, timeline_months)
+    return hashlib.sha256(json.dumps(normalized).encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """
+    Two-tier cache for generated plans.
+
+    Tier 1 is an in-process LRU with TTL. Tier 2 is a local SQLite file so
+    popular plans survive restarts and redeploys on the same disk. Keys are
+    content addresses from `plan_cache_key`.
+    """
+
+    def __init__(self, path: str = PLAN_CACHE_PATH, ttl_seconds: int = PLAN_CACHE_TTL_SECONDS,
+                 max_entries: int = PLAN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+    def _connection(self):
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plan_cache ("
+                    "key TEXT PRIMARY KEY, plan_json TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS plan_cache_created_at ON plan_cache (created_at)")
+                self._prune_expired(self._conn)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Plan cache: persistent tier disabled ({e})")
+                self._conn = False
+        return self._conn or None
+
+    def _prune_expired(self, conn):
+        # Expired rows are never served; drop them so the file doesn't grow forever.
+        conn.execute("DELETE FROM plan_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str) -> dict | None:
+        plan = self.memory.get(key)
+        if plan is not None:
+            self._count('memory_hits')
+            return plan
+
+        with self._lock:
+            conn = self._connection()
+            row = None
+            if conn:
+                try:
+                    row = conn.execute(
+                        "SELECT plan_json, created_at FROM plan_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Plan cache read error: {e}")
+
+        if row and time.time() - row[1] < self.ttl_seconds:
+            plan = json.loads(row[0])
+            self.memory.set(key, plan)
+            self._count('disk_hits')
+            return plan
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, plan: dict):
+        self.memory.set(key, plan)
+        with self._lock:
+            self.counters['stores'] += 1
+            conn = self._connection()
+            if not conn:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO plan_cache (key, plan_json, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(plan), time.time())
+                )
+                self._prune_expired(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Plan cache write error: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        total = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return {
+            **counters,
+            'memory_entries': len(self.memory),
+            'hit_rate': round(hits / total, 3) if total else 0.0
+        }
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,212 @@
+# backend/services/plan_generator.py
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+LESSONS_PER_MONTH = 20
+PLAN_FANOUT_WORKERS = int(os.environ.get("PLAN_FANOUT_WORKERS", 6))
+# Re-asks for malformed or empty responses; transport errors are already retried by the LLM gateway.
+PLAN_MODULE_RETRIES = int(os.environ.get("PLAN_MODULE_RETRIES", 2))
+
+# Shared across requests so concurrent plan generations can't spawn unbounded threads.
+_module_executor = ThreadPoolExecutor(max_workers=PLAN_FANOUT_WORKERS, thread_name_prefix='plan-module')
+
+
+class PlanGenerationError(Exception):
+    """Raised when the outline or a module could not be generated after retries."""
+
+
+class PlanGenerationCancelled(PlanGenerationError):
+    """Raised in a module worker once another module of the same plan has failed."""
+
+
+# ----------------------------- PROMPTS -----------------------------
+
+def build_outline_prompt(topic: str, difficulty: str, timeline_months: int) -> str:
+    total_lessons = int(timeline_months) * LESSONS_PER_MONTH
+    return f"""
+    Design the module outline of a day-by-day learning plan for:
+    Topic: "{topic}" | Level: "{difficulty}" | Duration: {timeline_months} months ({total_lessons} lessons)
+
+    Constraints:
+    1. Between {max(2, int(timeline_months))} and {max(4, int(timeline_months) * 2)} modules.
+    2. Pace: Basic -> Advanced. Each module builds on the previous one.
+    3. Do NOT list lessons, only modules.
+    4. Output JSON ONLY. No markdown.
+
+    Expected JSON Structure:
+    {{
+      "plan_title": "string",
+      "modules": [
+        {{
+          "module_number": 1,
+          "module_title": "string",
+          "summary": "one sentence on what this module covers"
+        }}
+      ]
+    }}
+    """
+
+
+def build_module_prompt(topic: str, difficulty: str, outline: dict, module: dict,
+                        lesson_count: int, first_day: int) -> str:
+    outline_lines = "\n".join(
+        f"    {m.get('module_number')}. {m.get('module_title')}" for m in outline.get('modules', [])
+    )
+    return f"""
+    You are writing one module of the learning plan "{outline.get('plan_title', topic)}".
+    Topic: "{topic}" | Level: "{difficulty}"
+
+    Full module outline (for context, do not repeat other modules' content):
+{outline_lines}
+
+    Write module {module.get('module_number')}: "{module.get('module_title')}".
+    Module focus: {module.get('summary', '')}
+
+    Constraints:
+    1. Exactly {lesson_count} lessons, numbered from day {first_day} to day {first_day + lesson_count - 1}.
+    2. Pace: Basic -> Advanced within the module. No filler days.
+    3. Output JSON ONLY. No markdown.
+
+    Expected JSON Structure:
+    {{
+      "lessons": [
+        {{
+          "day_of_plan": {first_day},
+          "topic": "string",
+          "description": "string",
+          "Youtube_keywords": "string"
+        }}
+      ]
+    }}
+    """
+
+
+# ----------------------------- HELPERS -----------------------------
+
+def extract_json_object(text: str) -> dict:
+    """Pulls the outermost JSON object out of a model response."""
+    json_match = re.search(r'\{.*\}', text or "", re.DOTALL)
+    if not json_match:
+        raise ValueError("No valid JSON object found in the AI response.")
+    return json.loads(json_match.group(0))
+
+
+def allocate_lessons(total_lessons: int, module_count: int) -> list:
+    """Splits `total_lessons` across modules as evenly as possible, earlier modules first."""
+    base, extra = divmod(total_lessons, module_count)
+    return [base + (1 if i < extra else 0) for i in range(module_count)]
+
+
+def _with_retries(fn, retries: int, label: str, cancelled: threading.Event | None = None):
+    """
+    Retries `fn` when the model's answer is unusable (not JSON, no modules or
+    lessons). Anything else, e.g. an API error the gateway already retried,
+    propagates straight away, so the two retry layers never multiply.
+    """
+    last_error = None
+    for attempt in range(retries + 1):
+        if cancelled is not None and cancelled.is_set():
+            raise PlanGenerationCancelled(f"{label} cancelled")
+        try:
+            return fn()
+        except ValueError as e:
+            last_error = e
+            print(f"Plan generation: {label} failed (attempt {attempt + 1}/{retries + 1}): {e}")
+            if attempt < retries:
+                time.sleep(0.5 * (2 ** attempt))
+    raise PlanGenerationError(f"{label} failed after {retries + 1} attempts: {last_error}")
+
+
+# ----------------------------- FAN-OUT GENERATOR -----------------------------
+
+def generate_plan_outline(topic: str, difficulty: str, timeline_months: int, generate_text) -> dict:
+    """Phase one: a short call that returns the plan title and module list."""
+    def attempt():
+        outline = extract_json_object(generate_text(build_outline_prompt(topic, difficulty, timeline_months)))
+        if not outline.get('modules'):
+            raise ValueError("Outline contained no modules.")
+        return outline
+
+    outline = _with_retries(attempt, PLAN_MODULE_RETRIES, "outline")
+    # Renumber so module order is deterministic regardless of what the model returned.
+    for number, module in enumerate(outline['modules'], start=1):
+        module['module_number'] = number
+    return outline
+
+
+def generate_module_lessons(topic: str, difficulty: str, outline: dict, module: dict,
+                            lesson_count: int, first_day: int, generate_text,
+                            cancelled: threading.Event | None = None) -> list:
+    """Phase two (one unit): generates and validates the lessons of a single module."""
+    def attempt():
+        prompt = build_module_prompt(topic, difficulty, outline, module, lesson_count, first_day)
+        lessons = extract_json_object(generate_text(prompt)).get('lessons') or []
+        lessons = [lesson for lesson in lessons if isinstance(lesson, dict) and lesson.get('topic')]
+        if not lessons:
+            raise ValueError("Module contained no lessons.")
+        return lessons[:lesson_count]
+
+    return _with_retries(attempt, PLAN_MODULE_RETRIES, f"module {module.get('module_number')}", cancelled)
+
+
+def generate_plan_fanout(topic: str, difficulty: str, timeline_months: int, generate_text, progress=None) -> dict:
+    """
+    Two-phase plan generation.
+
+    The outline is generated first, then every module's lessons are generated
+    concurrently on the shared bounded pool. Each module is retried on its own,
+    so one bad response doesn't discard the rest of the plan; if a module still
+    fails, the modules that haven't started are cancelled and running ones stop
+    before their next attempt. Day numbers are
+    assigned afterwards from module order, so the stitched plan is always
+    1..N with no gaps or overlaps.
+
+    `generate_text(prompt) -> str` performs the actual model call. With
+    `progress`, the partial plan ({plan_title, modules}) is published once the
+    outline is known and again as each module is stitched, in module order.
+    """
+    outline = generate_plan_outline(topic, difficulty, timeline_months, generate_text)
+    modules = outline['modules']
+    plan_title = outline.get('plan_title', topic)
+    if progress is not None:
+        progress({'plan_title': plan_title, 'modules': []})
+    lesson_counts = allocate_lessons(int(timeline_months) * LESSONS_PER_MONTH, len(modules))
+
+    futures = []
+    first_day = 1
+    cancelled = threading.Event()
+    for module, lesson_count in zip(modules, lesson_counts):
+        futures.append(_module_executor.submit(
+            generate_module_lessons, topic, difficulty, outline, module, lesson_count, first_day, generate_text,
+            cancelled
+        ))
+        first_day += lesson_count
+
+    day = 1
+    stitched_modules = []
+    for module, future in zip(modules, futures):
+        try:
+            lessons = future.result()
+        except Exception:
+            cancelled.set()
+            for pending in futures:
+                pending.cancel()
+            raise
+        for lesson in lessons:
+            lesson['day_of_plan'] = day
+            day += 1
+        stitched_modules.append({
+            'module_title': module.get('module_title'),
+            'module_number': module['module_number'],
+            'lessons': lessons
+        })
+        if progress is not None:
+            progress({'plan_title': plan_title, 'modules': list(stitched_modules)})
+
+    return {'plan_title': plan_title, 'modules': stitched_modules}
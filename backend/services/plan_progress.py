@@ -0,0 +1,129 @@
+# backend/services/plan_progress.py
+
+from firebase_admin import firestore
+
+from backend import db
+from backend.services.course_tree import LESSONS_KEYED_FLAG, load_course_tree
+from backend.services.queries import project
+
+# Counter fields kept on each plan document.
+COMPLETED_FIELD = 'completed_lessons'
+TOTAL_FIELD = 'total_lessons'
+COUNTER_FIELDS = (COMPLETED_FIELD, TOTAL_FIELD, 'progress')
+
+
+class PlanNotFoundError(Exception):
+    """The plan doesn't exist, isn't the caller's, or doesn't contain the lesson."""
+
+
+def progress_percent(completed: int, total: int) -> int:
+    return round((completed / total) * 100) if total > 0 else 0
+
+
+def has_counters(plan_data: dict) -> bool:
+    return COMPLETED_FIELD in plan_data and TOTAL_FIELD in plan_data
+
+
+def counters_from_lessons(lessons: list) -> dict:
+    completed = sum(1 for lesson in lessons if lesson.get('is_completed', False))
+    return {
+        COMPLETED_FIELD: completed,
+        TOTAL_FIELD: len(lessons),
+        'progress': progress_percent(completed, len(lessons))
+    }
+
+
+def plan_counters(plan_id: str, plan_data: dict, lessons: list | None = None) -> dict:
+    """
+    The plan's {completed_lessons, total_lessons, progress}. Read straight from
+    the plan document when it has counters; plans created before the counters
+    existed are counted once (from `lessons` if the caller already loaded
+    them) and the result is written back.
+    """
+    if has_counters(plan_data):
+        completed, total = plan_data.get(COMPLETED_FIELD, 0), plan_data.get(TOTAL_FIELD, 0)
+        return {COMPLETED_FIELD: completed, TOTAL_FIELD: total, 'progress': progress_percent(completed, total)}
+    return repair_plan_counters(plan_id, plan_data, lessons)
+
+
+def repair_plan_counters(plan_id: str, plan_data: dict | None = None, lessons: list | None = None) -> dict:
+    """Recounts a plan's lessons and overwrites its counters (fixes drift or missing counters)."""
+    if lessons is None:
+        _, lessons = load_course_tree(plan_id, plan_data, lesson_fields=['is_completed'])
+    counters = counters_from_lessons(lessons)
+    db.collection('plans').document(plan_id).update({**counters, 'last_updated': firestore.SERVER_TIMESTAMP})
+    return counters
+
+
+def _lesson_plan_id(lesson_data: dict, transaction) -> str | None:
+    """The plan a lesson belongs to; lessons saved before they carried planId are resolved through their module."""
+    if lesson_data.get('planId'):
+        return lesson_data['planId']
+    if not lesson_data.get('moduleId'):
+        return None
+    module_doc = db.collection('modules').document(lesson_data['moduleId']).get(
+        field_paths=['planId'], transaction=transaction
+    )
+    return module_doc.to_dict().get('planId') if module_doc.exists else None
+
+
+def set_lesson_completion(plan_id: str, lesson_id: str, is_completed: bool, user_id: str | None = None) -> dict:
+    """
+    Sets a lesson's completion flag and adjusts the plan's counters in one
+    transaction: two document reads whatever the plan size (three for lessons
+    that predate planId, checked through their module), and the counters
+    only move (by Increment) when the flag actually flips, so repeated clicks
+    and retries can't drift them. Returns the plan's counters plus 'changed'.
+    """
+    plan_ref = db.collection('plans').document(plan_id)
+    lesson_ref = db.collection('lessons').document(lesson_id)
+
+    plan_doc = plan_ref.get(field_paths=['userId', LESSONS_KEYED_FLAG, COMPLETED_FIELD, TOTAL_FIELD])
+    if not plan_doc.exists or (user_id and plan_doc.to_dict().get('userId') != user_id):
+        raise PlanNotFoundError(plan_id)
+    if not has_counters(plan_doc.to_dict()):
+        # One-time full count for plans created before the counters existed.
+        repair_plan_counters(plan_id, plan_doc.to_dict())
+
+    @firestore.transactional
+    def toggle(transaction):
+        plan_data = plan_ref.get(field_paths=[COMPLETED_FIELD, TOTAL_FIELD], transaction=transaction).to_dict() or {}
+        lesson_doc = lesson_ref.get(field_paths=['planId', 'moduleId', 'is_completed'], transaction=transaction)
+        if not lesson_doc.exists or _lesson_plan_id(lesson_doc.to_dict(), transaction) != plan_id:
+            raise PlanNotFoundError(lesson_id)
+
+        completed, total = plan_data.get(COMPLETED_FIELD, 0), plan_data.get(TOTAL_FIELD, 0)
+        changed = bool(lesson_doc.to_dict().get('is_completed', False)) != bool(is_completed)
+        if changed:
+            delta = 1 if is_completed else -1
+            completed += delta
+            transaction.update(lesson_ref, {
+                'is_completed': is_completed,
+                'last_updated': firestore.SERVER_TIMESTAMP
+            })
+            transaction.update(plan_ref, {
+                COMPLETED_FIELD: firestore.Increment(delta),
+                'progress': progress_percent(completed, total),
+                'last_updated': firestore.SERVER_TIMESTAMP
+            })
+        return {COMPLETED_FIELD: completed, TOTAL_FIELD: total, 'progress': progress_percent(completed, total), 'changed': changed}
+
+    return toggle(db.transaction())
+
+
+def repair_all_plan_counters():
+    """Repair tool: recounts every plan and fixes counters that drifted."""
+    checked, fixed = 0, 0
+    for plan in project(db.collection('plans'), [LESSONS_KEYED_FLAG, *COUNTER_FIELDS]):
+        plan_data = plan.to_dict()
+        _, lessons = load_course_tree(plan.id, plan_data, lesson_fields=['is_completed'])
+        counters = counters_from_lessons(lessons)
+        checked += 1
+        if any(plan_data.get(field) != value for field, value in counters.items()):
+            db.collection('plans').document(plan.id).update({**counters, 'last_updated': firestore.SERVER_TIMESTAMP})
+            fixed += 1
+    print(f"Plan progress counters: {checked} plans checked, {fixed} repaired.")
+
+
+if __name__ == '__main__':
+    repair_all_plan_counters()
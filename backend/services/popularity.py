@@ -0,0 +1,173 @@
+# backend/services/popularity.py
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+from firebase_admin import firestore
+from backend import db
+from backend.services.firestore_batch import ChunkedBatchWriter
+
+# --- Configuration ---
+# One counter document per distinct title, keyed by title_key().
+COUNTERS_COLLECTION = 'plan_title_counts'
+# Holds the bounded top-K snapshot the recommendation endpoints read.
+SNAPSHOT_COLLECTION = 'plan_popularity'
+SNAPSHOT_DOCUMENT = 'top'
+POPULARITY_SNAPSHOT_SIZE = int(os.environ.get("POPULARITY_SNAPSHOT_SIZE", 50))
+# How long a process serves its copy of the snapshot before reading it again.
+POPULARITY_REFRESH_SECONDS = int(os.environ.get("POPULARITY_REFRESH_SECONDS", 300))
+# A snapshot older than this is rebuilt by the first process that reads it.
+POPULARITY_SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get("POPULARITY_SNAPSHOT_MAX_AGE_SECONDS", 900))
+
+
+def title_key(title: str) -> str:
+    """Stable map key for a plan title (casefolded, whitespace-collapsed, hashed)."""
+    normalized = re.sub(r'\s+', ' ', (title or '').casefold()).strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _counter_ref(key: str):
+    return db.collection(COUNTERS_COLLECTION).document(key)
+
+
+def _snapshot_ref():
+    return db.collection(SNAPSHOT_COLLECTION).document(SNAPSHOT_DOCUMENT)
+
+
+def rebuild_snapshot(size: int = POPULARITY_SNAPSHOT_SIZE) -> list:
+    """
+    Writes the current top-`size` titles to the snapshot document: one
+    ordered query reading `size` counter documents, however many titles exist.
+    Run periodically (see __main__); top_titles() also triggers it when the
+    snapshot has gone stale.
+    """
+    query = db.collection(COUNTERS_COLLECTION).order_by('count', direction='DESCENDING').limit(size)
+    entries = []
+    for doc in query.select(['title', 'count']).stream():
+        data = doc.to_dict()
+        if data.get('title') and (data.get('count') or 0) > 0:
+            entries.append({'key': doc.id, 'title': data['title'], 'count': data['count']})
+    _snapshot_ref().set({'entries': entries, 'built_at': time.time(), 'updated_at': firestore.SERVER_TIMESTAMP})
+    return entries
+
+
+class PopularityIndex:
+    """
+    Plan-title popularity.
+
+    Every distinct title has its own counter document
+    (`plan_title_counts/<key>`: title, count), so no document grows with the
+    number of titles. The recommendation endpoints read only a bounded top-K
+    snapshot document, at most once per refresh interval per process;
+    the snapshot is rebuilt periodically from the counters.
+
+    Counter writes are best-effort and separate from the plan writes they
+    follow, so a failed increment can never fail a save or a delete.
+    """
+
+    def __init__(self, refresh_seconds: int = POPULARITY_REFRESH_SECONDS,
+                 max_age_seconds: int = POPULARITY_SNAPSHOT_MAX_AGE_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._entries = []
+        self._local = []  # (time, key, title, delta) written by this process, newer than the snapshot
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _apply(self, title: str, delta: int):
+        if not title:
+            return
+        key = title_key(title)
+        try:
+            _counter_ref(key).set({
+                'title': title,
+                'count': firestore.Increment(delta),
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }, merge=True)
+        except Exception as e:
+            print(f"Popularity counter update failed for {title!r}: {e}")
+            return
+
+        # Reflect our own write locally so this process doesn't wait for the next snapshot.
+        with self._lock:
+            self._local.append((time.time(), key, title, delta))
+
+    def record_plan_created(self, title: str):
+        """Counts a new plan. Call after the plan itself is committed."""
+        self._apply(title, 1)
+
+    def record_plan_deleted(self, title: str):
+        self._apply(title, -1)
+
+    def refresh(self):
+        """Reads the snapshot document (rebuilding it first if it's stale or missing)."""
+        snapshot = _snapshot_ref().get()
+        data = snapshot.to_dict() if snapshot.exists else {}
+        built_at = data.get('built_at') or 0
+        if time.time() - built_at > self.max_age_seconds:
+            built_at, entries = time.time(), rebuild_snapshot()
+        else:
+            entries = data.get('entries') or []
+        with self._lock:
+            self._entries = entries
+            self._local = [event for event in self._local if event[0] > built_at]
+            self._loaded_at = time.monotonic()
+
+    def top_titles(self, k: int = 5) -> list:
+        """The k most common plan titles, from the snapshot plus this process's own recent writes."""
+        if time.monotonic() - self._loaded_at > self.refresh_seconds:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Popularity refresh failed, serving last snapshot: {e}")
+        with self._lock:
+            counts = {entry['key']: [entry['title'], entry['count']] for entry in self._entries}
+            for _, key, title, delta in self._local:
+                counts.setdefault(key, [title, 0])[1] += delta
+        ranked = sorted(counts.values(), key=lambda item: item[1], reverse=True)
+        return [title for title, count in ranked[:k] if count > 0]
+
+
+popularity_index = PopularityIndex()
+
+
+def rebuild_popularity_index():
+    """
+    Backfill/repair: recomputes every title counter from the `plans`
+    collection, removes counters for titles no plan uses any more (and the
+    old single-document shards), then rebuilds the snapshot.
+    """
+    counts, titles = {}, {}
+    for plan in db.collection('plans').select(['plan_title']).stream():
+        title = plan.to_dict().get('plan_title')
+        if not title:
+            continue
+        key = title_key(title)
+        counts[key] = counts.get(key, 0) + 1
+        titles.setdefault(key, title)
+
+    with ChunkedBatchWriter(db) as writer:
+        for key, count in counts.items():
+            writer.set(_counter_ref(key), {'title': titles[key], 'count': count, 'updated_at': firestore.SERVER_TIMESTAMP})
+        for doc in db.collection(COUNTERS_COLLECTION).select([]).stream():
+            if doc.id not in counts:
+                writer.delete(doc.reference)
+        for doc in db.collection(SNAPSHOT_COLLECTION).select([]).stream():
+            if doc.id != SNAPSHOT_DOCUMENT:
+                writer.delete(doc.reference)
+    rebuild_snapshot()
+    popularity_index.refresh()
+    print(f"Popularity index rebuilt: {len(counts)} distinct titles.")
+
+
+if __name__ == '__main__':
+    # Schedule this (e.g. every few minutes) to keep the snapshot fresh:
+    #   python -m backend.services.popularity snapshot
+    if sys.argv[1:] == ['snapshot']:
+        print(f"Popularity snapshot rebuilt: {len(rebuild_snapshot())} titles.")
+    else:
+        rebuild_popularity_index()
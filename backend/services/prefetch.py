@@ -0,0 +1,100 @@
+# backend/services/prefetch.py
+
+import os
+import threading
+from collections import deque
+
+# --- Configuration ---
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 2))
+PREFETCH_PER_USER_LIMIT = int(os.environ.get("PREFETCH_PER_USER_LIMIT", 4))
+PREFETCH_GLOBAL_BUDGET = int(os.environ.get("PREFETCH_GLOBAL_BUDGET", 64))
+
+
+class Prefetcher:
+    """
+    Bounded background warmer for work a user is likely to need next.
+
+    - Tasks are deduplicated by key while pending or running.
+    - Each user may have at most `per_user_limit` tasks outstanding, and the
+      whole process at most `global_budget`; anything beyond is dropped
+      (prefetching is best-effort, the foreground path still works cold).
+    - Workers serve users round-robin, so one user finishing many lessons
+      in a row can't starve everyone else's prefetches.
+    """
+
+    def __init__(self, max_workers: int = PREFETCH_WORKERS, per_user_limit: int = PREFETCH_PER_USER_LIMIT,
+                 global_budget: int = PREFETCH_GLOBAL_BUDGET):
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self.global_budget = global_budget
+        self._cond = threading.Condition()
+        self._queues = {}          # user id -> deque of (key, fn, args)
+        self._user_order = deque()  # users with queued work, in round-robin order
+        self._outstanding = {}     # user id -> queued + running task count
+        self._keys = set()         # keys queued or running
+        self._total = 0
+        self._threads = []
+        self.dropped = 0
+
+    def _ensure_workers(self):
+        # Threads start lazily so importing the module doesn't spawn anything.
+        if self._threads:
+            return
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f'prefetch-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def schedule(self, user_id: str, key: str, fn, *args) -> bool:
+        """Queues `fn(*args)`; returns False if it was a duplicate or over budget."""
+        with self._cond:
+            if key in self._keys:
+                return False
+            if self._total >= self.global_budget or self._outstanding.get(user_id, 0) >= self.per_user_limit:
+                self.dropped += 1
+                return False
+            self._ensure_workers()
+            self._keys.add(key)
+            self._total += 1
+            self._outstanding[user_id] = self._outstanding.get(user_id, 0) + 1
+            if user_id not in self._queues:
+                self._queues[user_id] = deque()
+                self._user_order.append(user_id)
+            self._queues[user_id].append((key, fn, args))
+            self._cond.notify()
+            return True
+
+    def _next_task(self):
+        user_id = self._user_order.popleft()
+        queue = self._queues[user_id]
+        task = queue.popleft()
+        if queue:
+            self._user_order.append(user_id)
+        else:
+            del self._queues[user_id]
+        return user_id, task
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._user_order:
+                    self._cond.wait()
+                user_id, (key, fn, args) = self._next_task()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Prefetch task {key} failed: {e}")
+            finally:
+                with self._cond:
+                    self._keys.discard(key)
+                    self._total -= 1
+                    self._outstanding[user_id] -= 1
+                    if not self._outstanding[user_id]:
+                        del self._outstanding[user_id]
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._total
+
+
+prefetcher = Prefetcher()
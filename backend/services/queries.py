@@ -0,0 +1,50 @@
+# backend/services/queries.py
+
+# Helpers for reads that don't need whole documents. Counting uses a
+# server-side count() aggregation (one read per 1000 matches, no documents
+# transferred); id-only and field-limited reads use select() projections, so
+# only the requested fields cross the wire and get deserialized.
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+# Firestore caps the number of values in an 'in' filter.
+IN_QUERY_LIMIT = 30
+
+
+def count(query) -> int:
+    """Number of documents matching `query`, without fetching them."""
+    return query.count(alias='count').get()[0][0].value
+
+
+def ids(query) -> list:
+    """Document ids matching `query` (empty projection: names only)."""
+    return [doc.id for doc in query.select([]).stream()]
+
+
+def refs(query) -> list:
+    """Document references matching `query`, e.g. for batched deletes."""
+    return [doc.reference for doc in query.select([]).stream()]
+
+
+def project(query, fields: list):
+    """Streams snapshots carrying only `fields`."""
+    return query.select(list(fields)).stream()
+
+
+def exists(query) -> bool:
+    """Whether at least one document matches, reading at most one (empty) document."""
+    return next(iter(query.select([]).limit(1).stream()), None) is not None
+
+
+def first_id(query) -> str | None:
+    """Id of the first document of an ordered query."""
+    return next((doc.id for doc in query.select([]).limit(1).stream()), None)
+
+
+def where_in(query, field: str, values) -> list:
+    """`field in values` as one query per IN_QUERY_LIMIT values (no queries for no values)."""
+    values = list(values)
+    return [
+        query.where(filter=FieldFilter(field, 'in', values[i:i + IN_QUERY_LIMIT]))
+        for i in range(0, len(values), IN_QUERY_LIMIT)
+    ]
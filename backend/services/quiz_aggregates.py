@@ -0,0 +1,326 @@
+# backend/services/quiz_aggregates.py
+
+import os
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from backend import db
+from backend.services.cache import TTLCache
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.lesson_lookup import lesson_topics
+from backend.services.popularity import title_key
+
+# --- Configuration ---
+USER_STATS_COLLECTION = 'quiz_user_stats'
+LEADERBOARD_COLLECTION = 'leaderboards'
+# Entries kept per leaderboard document; pages show the first few.
+LEADERBOARD_SIZE = int(os.environ.get("LEADERBOARD_SIZE", 50))
+LEADERBOARD_CACHE_SECONDS = int(os.environ.get("LEADERBOARD_CACHE_SECONDS", 30))
+
+WINDOWS = ('all_time', 'weekly', 'monthly')
+
+_board_cache = TTLCache(max_size=64, ttl_seconds=LEADERBOARD_CACHE_SECONDS)
+
+
+# ----------------------------- TIME WINDOWS -----------------------------
+
+def period_key(window: str, when: datetime | None = None) -> str:
+    """Identifies the current period of a window: 'all', '2026-W42' or '2026-10' (UTC)."""
+    when = when or datetime.now(timezone.utc)
+    if window == 'weekly':
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if window == 'monthly':
+        return f"{when.year}-{when.month:02d}"
+    return 'all'
+
+
+def _board_ref(window: str, period: str):
+    return db.collection(LEADERBOARD_COLLECTION).document(f'{window}_{period}')
+
+
+def _user_stats_ref(user_id: str):
+    return db.collection(USER_STATS_COLLECTION).document(user_id)
+
+
+def _window_points(stats: dict, window: str, period: str) -> int:
+    points = stats.get('points', {}).get(window, {})
+    return points.get('score', 0) if points.get('period') == period else 0
+
+
+# ----------------------------- USER STATS -----------------------------
+
+def score_percent(score, total) -> int:
+    return round(((score or 0) / (total or 1)) * 100)
+
+
+def fold_attempt(stats: dict, score, total, lesson_id: str | None, topic: str | None) -> dict:
+    """Returns the stats fields after adding one attempt (count, percent sum, max, last lesson, per topic)."""
+    percent = score_percent(score, total)
+    topics = dict(stats.get('topics', {}))
+    key = title_key(topic or 'Unknown Topic')
+    entry = topics.get(key, {'topic': topic or 'Unknown Topic', 'count': 0, 'score_sum': 0, 'highest_score': 0})
+    topics[key] = {
+        'topic': entry['topic'],
+        'count': entry['count'] + 1,
+        'score_sum': entry['score_sum'] + percent,
+        'highest_score': max(entry['highest_score'], percent)
+    }
+    return {
+        'total_taken': stats.get('total_taken', 0) + 1,
+        'score_sum': stats.get('score_sum', 0) + percent,
+        'highest_score': max(stats.get('highest_score', 0), percent),
+        'last_lesson_id': lesson_id,
+        'last_topic': topic or 'Unknown Topic',
+        'topics': topics
+    }
+
+
+def stats_summary(stats: dict) -> dict:
+    """The quizzes page's stats panel from a stats document."""
+    total_taken = stats.get('total_taken', 0)
+    return {
+        'total_taken': total_taken,
+        'average_score': round(stats.get('score_sum', 0) / total_taken) if total_taken > 0 else 0,
+        'highest_score': stats.get('highest_score', 0),
+        'last_attempt': stats.get('last_topic', 'Unknown Topic') if total_taken else "N/A"
+    }
+
+
+def _stats_from_attempts(attempts: list, topics: dict) -> dict:
+    stats = {}
+    for data in sorted(attempts, key=lambda a: a.get('submitted_at') or datetime.min.replace(tzinfo=timezone.utc)):
+        stats = fold_attempt(stats, data.get('score'), data.get('total'), data.get('lessonId'), topics.get(data.get('lessonId')))
+    return stats
+
+
+def _points_from_attempts(attempts: list, periods: dict) -> dict:
+    """{window: points} for the given current periods: all-time, plus this week's and this month's attempts."""
+    points = {window: 0 for window in WINDOWS}
+    for data in attempts:
+        score = data.get('score', 0) or 0
+        submitted_at = data.get('submitted_at')
+        for window, period in periods.items():
+            if window == 'all_time' or (submitted_at and period_key(window, submitted_at) == period):
+                points[window] += score
+    return points
+
+
+def _points_field(points: dict, periods: dict) -> dict:
+    return {window: {'period': periods[window], 'score': points[window]} for window in WINDOWS}
+
+
+def rebuild_user_quiz_stats(user_id: str) -> dict:
+    """
+    Builds one user's stats and points from their attempts (used once for
+    users who predate the aggregate).
+    """
+    periods = {window: period_key(window) for window in WINDOWS}
+    attempts = [
+        attempt.to_dict() for attempt in db.collection('quiz_attempts')
+        .where(filter=FieldFilter('userId', '==', user_id))
+        .select(['lessonId', 'score', 'total', 'submitted_at']).stream()
+    ]
+    stats = {
+        **_stats_from_attempts(attempts, lesson_topics(a.get('lessonId') for a in attempts)),
+        'stats_version': 1,
+        'points': _points_field(_points_from_attempts(attempts, periods), periods)
+    }
+    _user_stats_ref(user_id).set(stats, merge=True)
+    return stats
+
+
+def user_quiz_stats(user_id: str) -> dict:
+    """The user's stats panel: one document read."""
+    doc = _user_stats_ref(user_id).get()
+    stats = doc.to_dict() if doc.exists else {}
+    if not stats.get('stats_version'):
+        stats = rebuild_user_quiz_stats(user_id)
+    return stats_summary(stats)
+
+
+# ----------------------------- LEADERBOARDS -----------------------------
+
+def _ranked(entries: list) -> list:
+    entries = sorted(entries, key=lambda entry: entry['score'], reverse=True)
+    return entries[:LEADERBOARD_SIZE]
+
+
+def _load_board(window: str, period: str) -> list:
+    key = (window, period)
+    entries = _board_cache.get(key)
+    if entries is None:
+        doc = _board_ref(window, period).get()
+        entries = doc.to_dict().get('entries', []) if doc.exists else []
+        _board_cache.set(key, entries)
+    return entries
+
+
+def _qualifies(entries: list, user_id: str, score: int) -> bool:
+    if len(entries) < LEADERBOARD_SIZE or any(entry['userId'] == user_id for entry in entries):
+        return True
+    return score > entries[-1]['score']
+
+
+def _upsert_board_entry(window: str, period: str, user_id: str, name: str, score: int):
+    board_ref = _board_ref(window, period)
+
+    @firestore.transactional
+    def upsert(transaction):
+        doc = board_ref.get(transaction=transaction)
+        current = doc.to_dict().get('entries', []) if doc.exists else []
+        # Checked against the board as read in the transaction, not a cached copy.
+        if not _qualifies(current, user_id, score):
+            return current
+        entries = [e for e in current if e['userId'] != user_id]
+        entries = _ranked(entries + [{'userId': user_id, 'name': name, 'score': score}])
+        transaction.set(board_ref, {
+            'window': window,
+            'period': period,
+            'entries': entries,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        return entries
+
+    _board_cache.set((window, period), upsert(db.transaction()))
+
+
+def _edit_board(window: str, period: str, edit):
+    """Rewrites a board's entries with `edit(entries)` in a transaction, if the board exists."""
+    board_ref = _board_ref(window, period)
+
+    @firestore.transactional
+    def apply(transaction):
+        doc = board_ref.get(transaction=transaction)
+        if not doc.exists:
+            return []
+        entries = edit(doc.to_dict().get('entries', []))
+        transaction.update(board_ref, {'entries': entries, 'updated_at': firestore.SERVER_TIMESTAMP})
+        return entries
+
+    _board_cache.set((window, period), apply(db.transaction()))
+
+
+def remove_user(user_id: str):
+    """Account deletion: drops the user's aggregate and their entries on the current leaderboards."""
+    _user_stats_ref(user_id).delete()
+    for window in WINDOWS:
+        period = period_key(window)
+        if any(entry['userId'] == user_id for entry in _load_board(window, period)):
+            _edit_board(window, period, lambda entries: [e for e in entries if e['userId'] != user_id])
+
+
+def rename_user(user_id: str, name: str | None):
+    """Profile edits: shows the user's new name in their aggregate and on the current leaderboards."""
+    name = name or 'Anonymous User'
+    stats_ref = _user_stats_ref(user_id)
+    if stats_ref.get(field_paths=['name']).exists:
+        stats_ref.update({'name': name})
+    for window in WINDOWS:
+        period = period_key(window)
+        if any(entry['userId'] == user_id and entry['name'] != name for entry in _load_board(window, period)):
+            _edit_board(window, period, lambda entries: [
+                {**e, 'name': name} if e['userId'] == user_id else e for e in entries
+            ])
+
+
+def top_scores(window: str = 'all_time', k: int = 5) -> list:
+    """The current top-k of a window as [{'rank', 'name', 'score'}]: one document read (or none, if cached)."""
+    entries = _load_board(window, period_key(window))
+    return [{'rank': i + 1, 'name': entry['name'], 'score': entry['score']} for i, entry in enumerate(entries[:k])]
+
+
+# ----------------------------- SUBMISSIONS -----------------------------
+
+def record_quiz_attempt(user_id: str, name: str | None, score: int, total: int = 1,
+                        lesson_id: str | None = None, topic: str | None = None) -> dict:
+    """
+    Folds one quiz attempt into the user's aggregate (stats and all-time,
+    weekly and monthly points) in a transaction, then updates each leaderboard the
+    user's new total qualifies for. Boards are bounded top-K lists; since a
+    user's points only grow within a period, a user can only enter a board
+    on their own submission. Qualification is checked inside each board's
+    transaction, against the board's current entries.
+    Returns the user's {window: points}.
+    """
+    name = name or 'Anonymous User'
+    periods = {window: period_key(window) for window in WINDOWS}
+    stats_ref = _user_stats_ref(user_id)
+
+    # Users whose stats predate the aggregate get their stats and points built
+    # from their attempts first; the attempt being recorded is already stored,
+    # so it's counted there and mustn't be added again.
+    stats_doc = stats_ref.get()
+    fold_stats = stats_doc.exists and bool(stats_doc.to_dict().get('stats_version'))
+    if not fold_stats:
+        rebuild_user_quiz_stats(user_id)
+    added = score if fold_stats else 0
+
+    @firestore.transactional
+    def add_points(transaction):
+        doc = stats_ref.get(transaction=transaction)
+        stats = doc.to_dict() if doc.exists else {}
+        totals = {window: _window_points(stats, window, period) + added for window, period in periods.items()}
+        quiz_stats = fold_attempt(stats, score, total, lesson_id, topic) if fold_stats else {}
+        transaction.set(stats_ref, {
+            **quiz_stats,
+            'name': name,
+            'points': _points_field(totals, periods),
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }, merge=True)
+        return totals
+
+    totals = add_points(db.transaction())
+
+    for window, period in periods.items():
+        _upsert_board_entry(window, period, user_id, name, totals[window])
+    return totals
+
+
+# ----------------------------- BACKFILL -----------------------------
+
+def rebuild_quiz_aggregates():
+    """
+    Backfill/repair: recomputes every user's aggregate (stats and points)
+    and the current leaderboards from `quiz_attempts` in one pass.
+    """
+    now = datetime.now(timezone.utc)
+    periods = {window: period_key(window, now) for window in WINDOWS}
+    attempts_by_user = {}
+
+    for attempt in db.collection('quiz_attempts').select(['userId', 'lessonId', 'score', 'total', 'submitted_at']).stream():
+        data = attempt.to_dict()
+        if data.get('userId'):
+            attempts_by_user.setdefault(data['userId'], []).append(data)
+    points = {user_id: _points_from_attempts(attempts, periods) for user_id, attempts in attempts_by_user.items()}
+
+    names = {
+        user.id: user.to_dict().get('username', 'Anonymous User')
+        for user in db.collection('users').select(['username']).stream()
+    }
+    topics = lesson_topics(a.get('lessonId') for attempts in attempts_by_user.values() for a in attempts)
+    with ChunkedBatchWriter(db) as writer:
+        for user_id, user_points in points.items():
+            writer.set(_user_stats_ref(user_id), {
+                **_stats_from_attempts(attempts_by_user[user_id], topics),
+                'stats_version': 1,
+                'name': names.get(user_id, 'Anonymous User'),
+                'points': _points_field(user_points, periods),
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+        for window, period in periods.items():
+            entries = _ranked([
+                {'userId': user_id, 'name': names.get(user_id, 'Anonymous User'), 'score': user_points[window]}
+                for user_id, user_points in points.items() if user_points[window] > 0
+            ])
+            writer.set(_board_ref(window, period), {
+                'window': window, 'period': period, 'entries': entries, 'updated_at': firestore.SERVER_TIMESTAMP
+            })
+            _board_cache.pop((window, period))
+    print(f"Quiz aggregates rebuilt for {len(points)} users.")
+
+
+if __name__ == '__main__':
+    rebuild_quiz_aggregates()
@@ -0,0 +1,220 @@
+# backend/services/similarity_index.py
+
+import os
+import threading
+
+import numpy as np
+
+from backend import db
+from backend.services.course_tree import LESSONS_KEYED_FLAG, load_course_tree
+from backend.services.popularity import title_key
+from backend.services.text_vectors import (
+    DEFAULT_DIM, char_ngrams, hashed_term_frequencies, l2_normalize_rows
+)
+
+# --- Configuration ---
+SIMILARITY_DIM = int(os.environ.get("SIMILARITY_DIM", DEFAULT_DIM))
+# Lesson topics beyond this many add little signal to a title's vector.
+MAX_TOPICS_PER_TITLE = 40
+# Titles scoring below this cosine similarity aren't worth recommending.
+MIN_TITLE_SIMILARITY = float(os.environ.get("MIN_TITLE_SIMILARITY", 0.2))
+# New titles are weighted with the current idf; the whole matrix is only
+# re-weighted once the titles added since the last pass exceed this share
+# of the index (and at least SIMILARITY_REWEIGHT_MIN_ROWS of them).
+SIMILARITY_REWEIGHT_FRACTION = float(os.environ.get("SIMILARITY_REWEIGHT_FRACTION", 0.1))
+SIMILARITY_REWEIGHT_MIN_ROWS = int(os.environ.get("SIMILARITY_REWEIGHT_MIN_ROWS", 50))
+
+
+class TitleSimilarityIndex:
+    """
+    TF-IDF over character n-grams of plan titles and their first lesson
+    topics, stored as a hashed NumPy matrix with one row per distinct title.
+    Term frequencies are kept sparse (bucket/count arrays per row); the
+    idf-weighted, row-normalized matrix is the only dense one.
+
+    Many users create plans with the same title, so rows are deduplicated by
+    title and each user just points at their rows. A "similar to your plans"
+    query is one matrix-vector product over the weighted matrix; the matrix
+    only grows when a genuinely new title is saved.
+
+    The index is built from the `plans` collection in a background thread;
+    until that finishes queries return nothing and callers fall back to
+    popular titles.
+    """
+
+    def __init__(self, dim: int = SIMILARITY_DIM):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._tf = []              # row index -> (bucket indices, term frequencies)
+        self._weighted = np.zeros((0, dim), dtype=np.float32)  # idf-weighted, row-normalized
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._idf = np.ones(dim, dtype=np.float32)
+        self._idf_rows = 0         # index size when the idf was last computed
+        self._weighted_rows = 0    # rows of _weighted that are filled in
+        self._size = 0
+        self._rows = {}            # title key -> row index
+        self._titles = []          # row index -> display title
+        self._plan_counts = []     # row index -> number of live plans with that title
+        self._user_rows = {}       # user id -> {row index: plan count}
+        self._plans = {}           # plan id -> (user id, row index)
+        self._pending = []         # (method, args) received while the index was loading
+        self._loading = False
+        self._loaded = False
+
+    # --- Index maintenance ---
+
+    def _append_row(self, title: str, topics) -> int:
+        text = " ".join([title, *list(topics)[:MAX_TOPICS_PER_TITLE]])
+        vector = hashed_term_frequencies(char_ngrams(text), self.dim)
+        buckets = np.flatnonzero(vector).astype(np.int32)
+        if self._size == self._weighted.shape[0]:
+            # Grow by half, not double, so spare capacity stays small next to the live rows.
+            grown = np.zeros((max(64, self._size + self._size // 2), self.dim), dtype=np.float32)
+            grown[:self._size] = self._weighted[:self._size]
+            self._weighted = grown
+        row = self._size
+        self._tf.append((buckets, vector[buckets]))
+        self._df[buckets] += 1
+        self._size += 1
+        self._titles.append(title)
+        self._plan_counts.append(0)
+        return row
+
+    def _add_locked(self, user_id: str, plan_id: str, title: str, topics=()):
+        if plan_id in self._plans:
+            return
+        key = title_key(title)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._append_row(title, topics() if callable(topics) else topics)
+            self._rows[key] = row
+        self._plans[plan_id] = (user_id, row)
+        self._plan_counts[row] += 1
+        user_rows = self._user_rows.setdefault(user_id, {})
+        user_rows[row] = user_rows.get(row, 0) + 1
+
+    def _remove_locked(self, plan_id: str):
+        if plan_id not in self._plans:
+            return
+        user_id, row = self._plans.pop(plan_id)
+        self._plan_counts[row] = max(0, self._plan_counts[row] - 1)
+        user_rows = self._user_rows.get(user_id, {})
+        if user_rows.get(row, 0) > 1:
+            user_rows[row] -= 1
+        else:
+            user_rows.pop(row, None)
+
+    def add_plan(self, user_id: str, plan_id: str, title: str, topics=()):
+        """Registers a newly saved plan (topics in course order). Only new titles touch the matrix."""
+        if not title or not user_id or not plan_id:
+            return
+        topics = list(topics)[:MAX_TOPICS_PER_TITLE]
+        with self._lock:
+            if self._loaded:
+                self._add_locked(user_id, plan_id, title, topics)
+            elif self._loading:
+                self._pending.append((self._add_locked, (user_id, plan_id, title, topics)))
+            # Before loading starts the plan will be picked up by the load itself.
+
+    def remove_plan(self, plan_id: str):
+        """Unregisters a deleted plan. The title row stays, but is hidden once no plan uses it."""
+        with self._lock:
+            if self._loaded:
+                self._remove_locked(plan_id)
+            elif self._loading:
+                self._pending.append((self._remove_locked, (plan_id,)))
+
+    def ensure_loaded(self):
+        """Starts building the index from the `plans` collection, once per process."""
+        with self._lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load, name='similarity-index-load', daemon=True).start()
+
+    def _load(self):
+        # Built into a separate index without holding our lock, then swapped in;
+        # saves and deletes that arrive meanwhile are queued and replayed (by
+        # plan id, so a plan the stream already saw isn't counted twice).
+        # Lesson topics are read only for the first plan seen with each title.
+        fresh = TitleSimilarityIndex(self.dim)
+        try:
+            for plan in db.collection('plans').select(['userId', 'plan_title', LESSONS_KEYED_FLAG]).stream():
+                plan_data = plan.to_dict()
+                if plan_data.get('plan_title') and plan_data.get('userId'):
+                    fresh._add_locked(
+                        plan_data['userId'], plan.id, plan_data['plan_title'],
+                        lambda plan_id=plan.id, plan_data=plan_data: _plan_topics(plan_id, plan_data)
+                    )
+        except Exception as e:
+            print(f"Similarity index load failed: {e}")
+            with self._lock:
+                self._loading = False
+                self._pending = []
+            return
+
+        with self._lock:
+            for name in ('_tf', '_weighted', '_df', '_size', '_rows', '_titles',
+                         '_plan_counts', '_user_rows', '_plans'):
+                setattr(self, name, getattr(fresh, name))
+            self._idf_rows = self._weighted_rows = 0
+            for method, args in self._pending:
+                method(*args)
+            self._pending = []
+            self._loaded, self._loading = True, False
+
+    def _weigh_rows(self, start: int, stop: int):
+        self._weighted[start:stop] = 0.0
+        for row in range(start, stop):
+            buckets, frequencies = self._tf[row]
+            self._weighted[row, buckets] = frequencies * self._idf[buckets]
+        self._weighted[start:stop] = l2_normalize_rows(self._weighted[start:stop])
+
+    def _weighted_matrix(self) -> np.ndarray:
+        n = self._size
+        threshold = max(SIMILARITY_REWEIGHT_MIN_ROWS, SIMILARITY_REWEIGHT_FRACTION * self._idf_rows)
+        if self._idf_rows == 0 or n - self._idf_rows > threshold:
+            self._idf = (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+            self._weigh_rows(0, n)
+            self._idf_rows = self._weighted_rows = n
+        elif self._weighted_rows < n:
+            self._weigh_rows(self._weighted_rows, n)
+            self._weighted_rows = n
+        return self._weighted[:n]
+
+    # --- Queries ---
+
+    def similar_for_user(self, user_id: str, k: int = 5) -> list:
+        """Titles most similar (cosine) to the centroid of the user's own plan titles."""
+        self.ensure_loaded()
+        with self._lock:
+            if not self._loaded:
+                return []
+            user_rows = self._user_rows.get(user_id)
+            if not user_rows or self._size == 0:
+                return []
+            weighted = self._weighted_matrix()
+            own = np.fromiter(user_rows.keys(), dtype=np.int64)
+            profile = l2_normalize_rows(weighted[own].mean(axis=0, keepdims=True))[0]
+
+            scores = weighted @ profile
+            scores[own] = -np.inf
+            scores[np.asarray(self._plan_counts) == 0] = -np.inf
+
+            k = min(k, self._size)
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            ranked = candidates[np.argsort(-scores[candidates])]
+            return [self._titles[row] for row in ranked if scores[row] >= MIN_TITLE_SIMILARITY]
+
+
+def _plan_topics(plan_id: str, plan_data: dict) -> list:
+    """The first MAX_TOPICS_PER_TITLE lesson topics of a stored plan, in course order."""
+    try:
+        _, lessons = load_course_tree(plan_id, plan_data, lesson_fields=['topic'])
+    except Exception as e:
+        print(f"Similarity index: could not read topics of plan {plan_id}: {e}")
+        return []
+    return [lesson.get('topic', '') for lesson in lessons[:MAX_TOPICS_PER_TITLE]]
+
+
+similarity_index = TitleSimilarityIndex()
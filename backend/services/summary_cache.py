@@ -0,0 +1,76 @@
+# backend/services/summary_cache.py
+
+import hashlib
+import os
+
+from firebase_admin import firestore
+from backend import db
+from backend.services.cache import TTLCache
+from backend.services.singleflight import SingleFlight
+
+# --- Configuration ---
+SUMMARY_COLLECTION = 'lesson_summaries'
+SUMMARY_MEMORY_ENTRIES = int(os.environ.get("SUMMARY_MEMORY_ENTRIES", 512))
+SUMMARY_MEMORY_TTL_SECONDS = int(os.environ.get("SUMMARY_MEMORY_TTL_SECONDS", 6 * 3600))
+
+_memory = TTLCache(max_size=SUMMARY_MEMORY_ENTRIES, ttl_seconds=SUMMARY_MEMORY_TTL_SECONDS)
+_in_flight = SingleFlight()
+
+
+def lesson_content_hash(topic: str, description: str) -> str:
+    """Hash of the inputs the summary is generated from; changes whenever the lesson text does."""
+    content = f"{(topic or '').strip()}\n{(description or '').strip()}"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _is_usable(content: dict) -> bool:
+    # Failed generations come back with an explanatory summary and no quiz; never cache those.
+    return bool(content and content.get('summary') and content.get('quiz'))
+
+
+def _load(content_hash: str) -> dict | None:
+    content = _memory.get(content_hash)
+    if content is not None:
+        return content
+    doc = db.collection(SUMMARY_COLLECTION).document(content_hash).get()
+    if doc.exists:
+        stored = doc.to_dict()
+        content = {'summary': stored.get('summary'), 'quiz': stored.get('quiz', [])}
+        _memory.set(content_hash, content)
+        return content
+    return None
+
+
+def _generate_and_store(content_hash: str, topic: str, description: str, generate_fn) -> dict:
+    # Another request may have finished generating while we were waiting to lead.
+    content = _load(content_hash)
+    if content is not None:
+        return content
+
+    content = generate_fn(topic, description)
+    if _is_usable(content):
+        content = {'summary': content.get('summary'), 'quiz': content.get('quiz')}
+        db.collection(SUMMARY_COLLECTION).document(content_hash).set({
+            'summary': content['summary'],
+            'quiz': content['quiz'],
+            'topic': topic,
+            'generated_at': firestore.SERVER_TIMESTAMP
+        })
+        _memory.set(content_hash, content)
+    return content
+
+
+def get_or_generate_summary(topic: str, description: str, generate_fn) -> tuple[dict, bool]:
+    """
+    Returns ({'summary', 'quiz'}, from_cache) for a lesson's content.
+
+    Summaries are keyed by the content hash, so identical lessons (e.g. from a
+    shared cached plan) reuse one generation across users, and an edited lesson
+    is regenerated automatically. Concurrent misses for the same content share
+    a single `generate_fn(topic, description)` call.
+    """
+    content_hash = lesson_content_hash(topic, description)
+    content = _load(content_hash)
+    if content is not None:
+        return content, True
+    return _in_flight.do(content_hash, _generate_and_store, content_hash, topic, description, generate_fn), False
@@ -0,0 +1,136 @@
+# backend/services/text_vectors.py
+
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+# Default dimensionality of hashed feature vectors. Collisions are rare enough at
+# this size for short texts (titles, topics); a dense float32 matrix costs 2 KB
+# per row at this size, i.e. ~200 MB for 100k rows.
+DEFAULT_DIM = 512
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens; keeps '+' and '#' so 'c++' and 'c#' survive."""
+    return _WORD_RE.findall((text or '').lower())
+
+
+def char_ngrams(text: str, n_min: int = 3, n_max: int = 4) -> list:
+    """Character n-grams of each word, padded with spaces so prefixes/suffixes count."""
+    grams = []
+    for word in tokenize(text):
+        padded = f" {word} "
+        for n in range(n_min, n_max + 1):
+            grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def feature_bucket(feature: str, dim: int) -> int:
+    # crc32 instead of hash(): stable across processes and restarts.
+    return zlib.crc32(feature.encode('utf-8')) % dim
+
+
+@lru_cache(maxsize=65536)
+def word_ngram_buckets(word: str, dim: int, n_min: int = 3, n_max: int = 4) -> tuple:
+    """Hashed buckets of one word's padded character n-grams (cached; words repeat a lot)."""
+    padded = f" {word} "
+    return tuple(
+        feature_bucket(padded[i:i + n], dim)
+        for n in range(n_min, n_max + 1) for i in range(max(1, len(padded) - n + 1))
+    )
+
+
+def hashed_term_frequencies(features: list, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Sublinear (1 + log tf) hashed term-frequency vector for a list of features."""
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    buckets = np.fromiter((feature_bucket(f, dim) for f in features), dtype=np.int64, count=len(features))
+    counts = np.bincount(buckets, minlength=dim).astype(np.float32)
+    nonzero = counts > 0
+    vector[nonzero] = 1.0 + np.log(counts[nonzero])
+    return vector
+
+
+def l2_normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# ----------------------------- SENTENCE EMBEDDINGS -----------------------------
+
+# SIF smoothing constant (Arora et al., "A Simple but Tough-to-Beat Baseline for
+# Sentence Embeddings"). The paper uses ~1e-3 with corpus-wide frequencies; word
+# frequencies here come from a handful of short texts, so the constant is larger.
+SIF_A = 1e-2
+
+
+class HashingEmbedder:
+    """
+    Model-free sentence embedder: hashed word unigrams + character n-grams.
+
+    With `sif=True` each word is weighted by a / (a + p(word)), where p is
+    estimated from the batch being embedded, so terms shared by every text
+    (e.g. "tutorial", "the") contribute little to the similarity. Nothing is
+    loaded at import time and there are no model files.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, sif: bool = True, sif_a: float = SIF_A,
+                 char_weight: float = 0.5):
+        self.dim = dim
+        self.sif = sif
+        self.sif_a = sif_a
+        self.char_weight = char_weight
+
+    def _word_weights(self, token_lists: list) -> dict:
+        if not self.sif:
+            return {}
+        counts = {}
+        for tokens in token_lists:
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+        total = sum(counts.values()) or 1
+        return {word: self.sif_a / (self.sif_a + count / total) for word, count in counts.items()}
+
+    def embed(self, texts: list) -> np.ndarray:
+        """Returns an L2-normalized (len(texts), dim) float32 matrix."""
+        token_lists = [tokenize(text) for text in texts]
+        weights = self._word_weights(token_lists)
+        size = len(texts) * self.dim
+
+        # Word features: one weighted bincount over (row, bucket) pairs for the whole batch.
+        word_index, word_weight = [], []
+        for row, tokens in enumerate(token_lists):
+            offset = row * self.dim
+            for token in tokens:
+                word_index.append(offset + feature_bucket('w:' + token, self.dim))
+                word_weight.append(weights.get(token, 1.0))
+        matrix = np.bincount(word_index, weights=word_weight, minlength=size) if word_index else np.zeros(size)
+
+        # Character n-grams: sublinear term frequency, also in a single bincount.
+        if self.char_weight:
+            char_index = []
+            for row, tokens in enumerate(token_lists):
+                offset = row * self.dim
+                for token in tokens:
+                    char_index.extend(offset + bucket for bucket in word_ngram_buckets(token, self.dim))
+            if char_index:
+                counts = np.bincount(char_index, minlength=size).astype(np.float64)
+                nonzero = counts > 0
+                counts[nonzero] = 1.0 + np.log(counts[nonzero])
+                matrix = matrix + self.char_weight * counts
+
+        return l2_normalize_rows(matrix.reshape(len(texts), self.dim).astype(np.float32))
+
+    def score(self, query: str, candidates: list) -> np.ndarray:
+        """Cosine similarity of each candidate text to the query, in one matrix product."""
+        if not candidates:
+            return np.zeros(0, dtype=np.float32)
+        matrix = self.embed([query, *candidates])
+        return matrix[1:] @ matrix[0]
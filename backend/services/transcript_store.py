@@ -0,0 +1,152 @@
+# backend/services/transcript_store.py
+
+import bisect
+import json
+import os
+import zlib
+
+from firebase_admin import firestore
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from backend import db
+from backend.services.cache import TTLCache
+from backend.services.firestore_batch import ChunkedBatchWriter
+from backend.services.singleflight import SingleFlight
+
+# --- Configuration ---
+TRANSCRIPT_COLLECTION = 'transcripts'
+TRANSCRIPT_CHUNK_SEGMENTS = int(os.environ.get("TRANSCRIPT_CHUNK_SEGMENTS", 200))
+TRANSCRIPT_CACHE_CHUNKS = int(os.environ.get("TRANSCRIPT_CACHE_CHUNKS", 512))
+
+_meta_cache = TTLCache(max_size=1024, ttl_seconds=24 * 3600)
+_chunk_cache = TTLCache(max_size=TRANSCRIPT_CACHE_CHUNKS, ttl_seconds=6 * 3600)
+_in_flight = SingleFlight()
+
+
+def video_id_from_url(video_url: str) -> str | None:
+    """Extracts the video ID from the embed URLs stored on lessons."""
+    if video_url and 'embed/' in video_url:
+        return video_url.split('embed/')[-1].split('?')[0] or None
+    return None
+
+
+def _compress_segments(segments: list) -> bytes:
+    rows = [[round(s.get('start', 0.0), 2), round(s.get('duration', 0.0), 2), s.get('text', '')] for s in segments]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _decompress_segments(data: bytes) -> list:
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _transcript_ref(video_id: str):
+    return db.collection(TRANSCRIPT_COLLECTION).document(video_id)
+
+
+def _store(video_id: str, segments: list) -> dict:
+    """Writes the transcript as zlib-compressed chunks of TRANSCRIPT_CHUNK_SEGMENTS segments each."""
+    chunks = [segments[i:i + TRANSCRIPT_CHUNK_SEGMENTS] for i in range(0, len(segments), TRANSCRIPT_CHUNK_SEGMENTS)]
+    meta = {
+        'segment_count': len(segments),
+        'chunk_count': len(chunks),
+        'chunk_starts': [chunk[0].get('start', 0.0) for chunk in chunks],
+        'duration': (segments[-1].get('start', 0.0) + segments[-1].get('duration', 0.0)) if segments else 0.0
+    }
+    ref = _transcript_ref(video_id)
+    with ChunkedBatchWriter(db) as writer:
+        for index, chunk in enumerate(chunks):
+            data = _compress_segments(chunk)
+            writer.set(ref.collection('chunks').document(f'{index:05d}'), {'data': data})
+            _chunk_cache.set((video_id, index), _decompress_segments(data))
+        # Meta last, so a reader never sees a transcript whose chunks aren't written yet.
+        writer.set(ref, {**meta, 'fetched_at': firestore.SERVER_TIMESTAMP})
+    return meta
+
+
+def _load_stored_meta(video_id: str) -> dict | None:
+    doc = _transcript_ref(video_id).get()
+    if not doc.exists:
+        return None
+    stored = doc.to_dict()
+    stored.pop('fetched_at', None)
+    return stored
+
+
+def _load_or_fetch_meta(video_id: str) -> dict:
+    meta = _meta_cache.get(video_id)
+    if meta is not None:
+        return meta
+
+    def load():
+        stored = _load_stored_meta(video_id)
+        if stored is not None:
+            return stored
+        # Only the first request for a video ever goes to YouTube; errors like
+        # TranscriptsDisabled propagate to the caller.
+        return _store(video_id, YouTubeTranscriptApi.get_transcript(video_id))
+
+    meta = _in_flight.do(video_id, load)
+    _meta_cache.set(video_id, meta)
+    return meta
+
+
+class TranscriptReader:
+    """
+    Streaming view over a stored transcript.
+
+    Only the chunks overlapping the requested time range are fetched and
+    decompressed; decompressed chunks are kept in a process-wide LRU.
+    """
+
+    def __init__(self, video_id: str, meta: dict):
+        self.video_id = video_id
+        self.meta = meta
+
+    @property
+    def duration(self) -> float:
+        return self.meta.get('duration', 0.0)
+
+    def _chunk(self, index: int) -> list:
+        key = (self.video_id, index)
+        rows = _chunk_cache.get(key)
+        if rows is None:
+            doc = _transcript_ref(self.video_id).collection('chunks').document(f'{index:05d}').get()
+            rows = _decompress_segments(doc.to_dict()['data']) if doc.exists else []
+            _chunk_cache.set(key, rows)
+        return rows
+
+    def iter_segments(self, start: float | None = None, end: float | None = None):
+        """Yields (start, duration, text) tuples for segments overlapping [start, end)."""
+        starts = self.meta.get('chunk_starts', [])
+        first = max(0, bisect.bisect_right(starts, start) - 1) if start is not None else 0
+        last = bisect.bisect_left(starts, end) if end is not None else len(starts)
+        for index in range(first, min(last, len(starts))):
+            for seg_start, seg_duration, text in self._chunk(index):
+                if start is not None and seg_start + seg_duration <= start:
+                    continue
+                if end is not None and seg_start >= end:
+                    return
+                yield seg_start, seg_duration, text
+
+    def iter_text(self, start: float | None = None, end: float | None = None):
+        for _, _, text in self.iter_segments(start, end):
+            yield text
+
+    def text(self, start: float | None = None, end: float | None = None, separator: str = "\n") -> str:
+        return separator.join(self.iter_text(start, end))
+
+
+def open_transcript(video_id: str) -> TranscriptReader:
+    """Returns a reader for a video's transcript, fetching and storing it on first use."""
+    return TranscriptReader(video_id, _load_or_fetch_meta(video_id))
+
+
+def open_stored_transcript(video_id: str) -> TranscriptReader | None:
+    """A reader for a transcript that is already stored, or None; never goes to YouTube."""
+    meta = _meta_cache.get(video_id)
+    if meta is None:
+        meta = _load_stored_meta(video_id)
+        if meta is None:
+            return None
+        _meta_cache.set(video_id, meta)
+    return TranscriptReader(video_id, meta)
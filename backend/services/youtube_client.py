@@ -0,0 +1,114 @@
+# backend/services/youtube_client.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.services.cache import TTLCache
+from backend.services.singleflight import SingleFlight
+
+# --- Configuration ---
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+YOUTUBE_SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("YOUTUBE_SEARCH_CACHE_TTL_SECONDS", 24 * 3600))
+YOUTUBE_SEARCH_CACHE_ENTRIES = int(os.environ.get("YOUTUBE_SEARCH_CACHE_ENTRIES", 4096))
+YOUTUBE_BATCH_WORKERS = int(os.environ.get("YOUTUBE_BATCH_WORKERS", 5))
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=('GET',))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=YOUTUBE_BATCH_WORKERS * 2, max_retries=retries)
+    session.mount('https://', adapter)
+    return session
+
+
+# One keep-alive connection pool shared by every search in the process.
+_session = _build_session()
+_search_cache = TTLCache(max_size=YOUTUBE_SEARCH_CACHE_ENTRIES, ttl_seconds=YOUTUBE_SEARCH_CACHE_TTL_SECONDS)
+_in_flight = SingleFlight()
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', (query or '').casefold()).strip()
+
+
+def lesson_search_query(lesson: dict) -> str:
+    return f"{lesson.get('topic', '')} tutorial"
+
+
+def _fetch_candidates(query: str, max_results: int) -> list:
+    api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not api_key:
+        return []
+    response = _session.get(
+        YOUTUBE_SEARCH_URL,
+        params={'part': 'snippet', 'q': query, 'type': 'video', 'maxResults': max_results, 'key': api_key},
+        timeout=YOUTUBE_TIMEOUT
+    )
+    response.raise_for_status()
+    candidates = []
+    for item in response.json().get('items', []):
+        video_id = item.get('id', {}).get('videoId')
+        if video_id:
+            snippet = item.get('snippet', {})
+            candidates.append({
+                'video_id': video_id,
+                'title': snippet.get('title', ''),
+                'description': snippet.get('description', '')
+            })
+    return candidates
+
+
+def search_videos(query: str, max_results: int = 5) -> list:
+    """
+    Candidate videos for a search query. Results are cached per normalized
+    query across all lessons and users, and concurrent identical searches
+    share one API call.
+    """
+    key = (normalize_query(query), max_results)
+    candidates = _search_cache.get(key)
+    if candidates is not None:
+        return candidates
+
+    def fetch():
+        cached = _search_cache.get(key)
+        if cached is not None:
+            return cached
+        result = _fetch_candidates(key[0], max_results)
+        if result:
+            _search_cache.set(key, result)
+        else:
+            # Empty results are cached too, but briefly, so quota isn't spent re-asking.
+            _search_cache.set(key, result, ttl_seconds=600)
+        return result
+
+    return _in_flight.do(key, fetch)
+
+
+def embed_url(video_id: str) -> str:
+    return f"https://www.youtube.com/embed/{video_id}"
+
+
+def search_videos_batch(queries: list, max_results: int = 5) -> dict:
+    """Resolves many queries concurrently; returns {query: candidates}. Failed searches map to []."""
+    unique_queries = list(dict.fromkeys(queries))
+
+    def safe_search(query):
+        try:
+            return search_videos(query, max_results)
+        except Exception as e:
+            print(f"YouTube search error for '{query}': {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=min(YOUTUBE_BATCH_WORKERS, max(1, len(unique_queries)))) as pool:
+        results = pool.map(safe_search, unique_queries)
+    return dict(zip(unique_queries, results))
+
+
+def search_stats() -> dict:
+    return _search_cache.stats()
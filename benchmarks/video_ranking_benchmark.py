@@ -0,0 +1,77 @@
+# benchmarks/video_ranking_benchmark.py
+"""
+Offline benchmark for video candidate ranking.
+
+Compares the old behaviour (always take the first YouTube search result)
+with the built-in NumPy HashingEmbedder, with and without SIF weighting,
+on a small hand-labelled set of lessons and search results.
+
+Usage:
+    python benchmarks/video_ranking_benchmark.py
+"""
+
+import importlib.util
+import json
+import os
+import statistics
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'video_ranking_cases.json')
+
+
+def _load_text_vectors():
+    # Load the module directly so the benchmark doesn't initialize Flask/Firebase via `backend`.
+    path = os.path.join(ROOT, 'backend', 'services', 'text_vectors.py')
+    spec = importlib.util.spec_from_file_location('text_vectors', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _texts(case):
+    lesson = case['lesson']
+    lesson_text = f"{lesson['topic']}: {lesson['description']}"
+    video_texts = [f"{c['title']}: {c['description']}" for c in case['candidates']]
+    return lesson_text, video_texts
+
+
+def evaluate(name, rank_fn, cases, repeats=200):
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for case in cases:
+        lesson_text, video_texts = _texts(case)
+        order = rank_fn(lesson_text, video_texts)
+        hits += order[0] == case['relevant']
+        reciprocal_ranks.append(1.0 / (order.index(case['relevant']) + 1))
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            rank_fn(lesson_text, video_texts)
+        latencies.append((time.perf_counter() - started) / repeats * 1000)
+
+    print(f"{name:<28} top-1 {hits / len(cases):6.1%}   MRR {statistics.mean(reciprocal_ranks):.3f}   "
+          f"latency mean {statistics.mean(latencies):.3f} ms   max {max(latencies):.3f} ms")
+
+
+def main():
+    text_vectors = _load_text_vectors()
+    with open(CASES_PATH, encoding='utf-8') as f:
+        cases = json.load(f)
+
+    def first_result(lesson_text, video_texts):
+        return list(range(len(video_texts)))
+
+    def embedder_ranker(embedder):
+        def rank(lesson_text, video_texts):
+            scores = embedder.score(lesson_text, video_texts)
+            return [int(i) for i in (-scores).argsort(kind='stable')]
+        return rank
+
+    print(f"{len(cases)} labelled lessons, {len(cases[0]['candidates'])} candidates each\n")
+    evaluate("first result (baseline)", first_result, cases)
+    evaluate("hashing embedder", embedder_ranker(text_vectors.HashingEmbedder(sif=False)), cases)
+    evaluate("hashing embedder + SIF", embedder_ranker(text_vectors.HashingEmbedder(sif=True)), cases)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The service modules under test are pure Python. Register `backend` as a bare
+# package so importing them doesn't run backend/__init__.py, which creates the
+# Flask app and connects to Firebase.
+if 'backend' not in sys.modules:
+    backend = types.ModuleType('backend')
+    backend.__path__ = [os.path.join(ROOT, 'backend')]
+    sys.modules['backend'] = backend
+    # Modules that also talk to Firestore do `from backend import db`; their
+    # pure helpers are tested without a client (and need firebase_admin).
+    backend.db = None
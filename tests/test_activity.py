@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip('firebase_admin')
+
+from backend.services import activity
+from backend.services.activity import (
+    EVENT_LESSON_COMPLETED, EVENT_LESSON_UNCOMPLETED, EVENT_QUIZ_SUBMITTED, apply_event, level_for_xp, quiz_xp
+)
+
+MONDAY = date(2026, 10, 12)
+
+
+def day(offset):
+    return date.fromordinal(MONDAY.toordinal() + offset)
+
+
+def run(events, progress=None):
+    progress = progress or {}
+    for event_type, xp, when in events:
+        progress = apply_event(progress, event_type, xp, when)
+    return progress
+
+
+def test_first_event_starts_a_streak():
+    progress = apply_event({}, EVENT_LESSON_COMPLETED, 50, MONDAY)
+    assert progress == {
+        'xp': 50, 'level': 1, 'completed_topics': 1, 'current_streak': 1,
+        'longest_streak': 1, 'last_active_day': '2026-10-12', 'events': 1
+    }
+
+
+def test_events_on_the_same_day_keep_the_streak():
+    progress = run([(EVENT_LESSON_COMPLETED, 50, MONDAY), (EVENT_QUIZ_SUBMITTED, 15, MONDAY)])
+    assert (progress['current_streak'], progress['xp'], progress['events']) == (1, 65, 2)
+    assert progress['completed_topics'] == 1
+
+
+def test_consecutive_days_extend_the_streak_and_a_gap_resets_it():
+    progress = run([(EVENT_QUIZ_SUBMITTED, 10, day(i)) for i in (0, 1, 2)])
+    assert (progress['current_streak'], progress['longest_streak']) == (3, 3)
+    progress = run([(EVENT_QUIZ_SUBMITTED, 10, day(4))], progress)
+    assert (progress['current_streak'], progress['longest_streak']) == (1, 3)
+    assert progress['last_active_day'] == day(4).isoformat()
+
+
+def test_undo_takes_back_xp_and_topic_but_not_the_streak():
+    progress = run([(EVENT_LESSON_COMPLETED, 50, day(0)), (EVENT_LESSON_COMPLETED, 50, day(1))])
+    progress = apply_event(progress, EVENT_LESSON_UNCOMPLETED, -50, day(3))
+    assert (progress['xp'], progress['completed_topics']) == (50, 1)
+    # Not activity: the streak and last active day are unchanged.
+    assert (progress['current_streak'], progress['last_active_day']) == (2, day(1).isoformat())
+    assert progress['events'] == 3
+
+
+def test_undo_as_the_first_event_does_not_start_a_streak():
+    progress = apply_event({}, EVENT_LESSON_UNCOMPLETED, -50, MONDAY)
+    assert (progress['current_streak'], progress['longest_streak'], progress['last_active_day']) == (0, 0, None)
+
+
+def test_undo_never_goes_below_zero():
+    progress = apply_event({'xp': 20, 'completed_topics': 0}, EVENT_LESSON_UNCOMPLETED, -50, MONDAY)
+    assert (progress['xp'], progress['completed_topics'], progress['level']) == (0, 0, 1)
+
+
+def test_levels_grow_quadratically(monkeypatch):
+    monkeypatch.setattr(activity, 'LEVEL_XP_STEP', 100)
+    assert [level_for_xp(xp) for xp in (0, 99, 100, 399, 400, 900, -5)] == [1, 1, 2, 2, 3, 4, 1]
+
+
+def test_quiz_xp_adds_a_bonus_per_ten_percent(monkeypatch):
+    monkeypatch.setattr(activity, 'QUIZ_BASE_XP', 10)
+    assert quiz_xp(0, 4) == 10
+    assert quiz_xp(3, 4) == 17
+    assert quiz_xp(4, 4) == 20
+    assert quiz_xp(None, 0) == 10
+    assert quiz_xp(9, 4) == 20
@@ -0,0 +1,84 @@
+from backend.services import cache as cache_module
+from backend.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_get_set_and_default():
+    cache = TTLCache()
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('b', 'default') == 'default'
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1}
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')          # 'b' is now least recently used
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_overwriting_refreshes_recency():
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)
+    cache.set('c', 3)
+    assert cache.get('a') == 10
+    assert 'b' not in cache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl_seconds=10)
+    cache.set('a', 1)
+    clock.now += 9
+    assert cache.get('a') == 1
+    clock.now += 2
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    assert len(cache) == 0  # the expired entry was dropped on read
+
+
+def test_per_entry_ttl_and_no_expiry(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl_seconds=10)
+    cache.set('short', 1, ttl_seconds=1)
+    cache.set('forever', 2, ttl_seconds=None)
+    clock.now += 10 ** 6
+    assert cache.get('short') is None
+    assert cache.get('forever') == 2
+
+
+def test_falsy_values_are_hits():
+    cache = TTLCache()
+    cache.set('none', None)
+    cache.set('zero', 0)
+    assert cache.get('none', 'default') is None
+    assert cache.get('zero', 'default') == 0
+    assert cache.hits == 2
+
+
+def test_pop_and_clear():
+    cache = TTLCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'gone') == 'gone'
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.job_queue import (
+    InMemoryJobStore, JobQueue, QueueFullError, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+)
+
+
+def wait_for_state(queue, job_id, state, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if queue.get(job_id)['state'] == state:
+            return queue.get(job_id)
+        time.sleep(0.005)
+    raise AssertionError(f"job {job_id} never reached {state}: {queue.get(job_id)}")
+
+
+def test_job_result_and_owner():
+    queue = JobQueue('test')
+    job_id = queue.submit(lambda a, b: a + b, 2, 3, owner='u1')
+    job = wait_for_state(queue, job_id, JOB_DONE)
+    assert job['result'] == 5
+    assert job['owner'] == 'u1' and job['kind'] == 'test'
+    assert job['started_at'] <= job['finished_at']
+
+
+def test_failed_job_records_error():
+    queue = JobQueue('test')
+
+    def boom():
+        raise RuntimeError('model overloaded')
+
+    job = wait_for_state(queue, queue.submit(boom), JOB_FAILED)
+    assert job['error'] == 'model overloaded'
+    assert job['result'] is None
+
+
+def test_admission_control_rejects_when_full():
+    release = threading.Event()
+    queue = JobQueue('test', max_workers=1, max_pending=2)
+    running = queue.submit(release.wait, 2)
+    queued = queue.submit(release.wait, 2)
+    wait_for_state(queue, running, JOB_RUNNING)
+    assert queue.get(queued)['state'] == JOB_QUEUED
+    assert queue.depth() == 2
+
+    with pytest.raises(QueueFullError):
+        queue.submit(lambda: None)
+
+    release.set()
+    wait_for_state(queue, queued, JOB_DONE)
+    assert queue.depth() == 0
+    wait_for_state(queue, queue.submit(lambda: 'ok'), JOB_DONE)
+
+
+def test_admission_is_per_kind_on_a_shared_store():
+    store, release = InMemoryJobStore(), threading.Event()
+    plans = JobQueue('plans', store=store, max_workers=1, max_pending=1)
+    deletes = JobQueue('deletes', store=store, max_workers=1, max_pending=1)
+    plans.submit(release.wait, 2)
+    with pytest.raises(QueueFullError):
+        plans.submit(lambda: None)
+    job_id = deletes.submit(lambda: 'ok')
+    wait_for_state(deletes, job_id, JOB_DONE)
+    release.set()
+
+
+def test_progress_callback():
+    queue = JobQueue('test')
+    seen = threading.Event()
+
+    def work(total, progress):
+        progress({'done': 1, 'total': total})
+        seen.wait(2)
+        return total
+
+    job_id = queue.submit(work, 3, report_progress=True)
+    deadline = time.monotonic() + 2
+    while queue.get(job_id)['progress'] is None and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert queue.get(job_id)['progress'] == {'done': 1, 'total': 3}
+    seen.set()
+    assert wait_for_state(queue, job_id, JOB_DONE)['result'] == 3
+
+
+def test_finished_jobs_are_purged_after_ttl(monkeypatch):
+    store = InMemoryJobStore(finished_ttl_seconds=60)
+    queue = JobQueue('test', store=store)
+    old = queue.submit(lambda: None)
+    wait_for_state(queue, old, JOB_DONE)
+
+    later = time.time() + 120
+    monkeypatch.setattr('backend.services.job_queue.time.time', lambda: later)
+    queue.submit(lambda: None)
+    assert queue.get(old) is None
+
+
+def test_store_returns_copies():
+    store = InMemoryJobStore()
+    store.create({'id': 'j', 'kind': 'k', 'state': JOB_QUEUED})
+    store.get('j')['state'] = JOB_DONE
+    assert store.get('j')['state'] == JOB_QUEUED
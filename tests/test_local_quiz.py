@@ -0,0 +1,26 @@
+from backend.services.local_quiz import _distractors, _stem, generate_cloze_quiz
+
+
+def test_distractors_never_repeat_a_stem():
+    pool = ['trees', 'tree', 'graphs', 'graph', 'nodes', 'node', 'edges', 'python']
+    distractors = _distractors('python', pool)
+    assert len(distractors) == 3
+    assert len({_stem(term) for term in distractors}) == 3
+    assert 'python' not in distractors
+
+
+def test_distractors_keep_the_first_variant_of_a_stem():
+    assert set(_distractors('python', ['graphs', 'graph'], count=2)) == {'graphs'}
+
+
+def test_quiz_options_are_distinct_words():
+    text = (
+        "Binary trees store values in nodes. Each tree node has at most two child nodes. "
+        "Graphs generalise trees because a graph can contain cycles between nodes. "
+        "Traversal of graphs visits every node once using a queue or a stack. "
+        "Balanced trees keep lookups fast because the tree height stays logarithmic. "
+        "Weighted graphs attach a cost to each edge and shortest paths minimise that cost. "
+    ) * 2
+    for question in generate_cloze_quiz(text, seed=1)['quiz']:
+        stems = [_stem(option) for option in question['options']]
+        assert len(stems) == len(set(stems)), question['options']
@@ -0,0 +1,41 @@
+import pytest
+
+from backend.services.pagination import (
+    InvalidCursorError, MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size_from
+)
+
+
+@pytest.mark.parametrize('doc_id', ['abc', 'a' * 20, 'Zx9_-', 'id with spaces/é', ''])
+def test_cursor_round_trip(doc_id):
+    cursor = encode_cursor(doc_id)
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor  # url-safe, unpadded
+    assert decode_cursor(cursor) == doc_id
+
+
+def test_cursor_is_opaque():
+    assert 'abc' not in encode_cursor('abc')
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'e30', 'bnVsbA', encode_cursor('x')[:-3], '%%%'])
+def test_malformed_cursor_is_rejected(cursor):
+    # 'e30' is {} and 'bnVsbA' is null: valid JSON without the 'after' key.
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_invalid_cursor_is_a_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor('!!')
+
+
+@pytest.mark.parametrize('args, expected', [
+    ({}, 20),
+    ({'limit': '5'}, 5),
+    ({'limit': '0'}, 1),
+    ({'limit': '-3'}, 1),
+    ({'limit': str(MAX_PAGE_SIZE + 50)}, MAX_PAGE_SIZE),
+    ({'limit': 'ten'}, 20),
+    ({'limit': None}, 20),
+])
+def test_page_size_from(args, expected):
+    assert page_size_from(args) == expected
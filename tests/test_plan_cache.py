@@ -0,0 +1,82 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import plan_cache
+from backend.services.plan_cache import PlanCache, normalize_plan_request, plan_cache_key
+
+
+def topic(text):
+    return normalize_plan_request(text, 'beginner', 3)[0]
+
+
+@pytest.mark.parametrize('typed, abbreviation', [
+    ('Machine Learning', 'ML'),
+    ('Deep Learning', 'DL'),
+    ('machine learning course', 'learn ML'),
+    ('Natural Language Processing', 'NLP'),
+    ('Data Structures & Algorithms', 'DSA'),
+    ('JavaScript', 'js'),
+])
+def test_synonyms_fold_to_the_same_key(typed, abbreviation):
+    assert topic(typed) == topic(abbreviation)
+    assert plan_cache_key(typed, 'Beginner', 3) == plan_cache_key(abbreviation, 'basic', 3)
+
+
+def test_expansions_keep_their_words():
+    assert topic('Machine Learning') == 'machine learning'
+    assert topic('Machine') == 'machine'
+    assert topic('Machine Learning') != topic('Machine')
+
+
+@pytest.mark.parametrize('text', ['Python', 'learn python', 'Learning Python', 'the python course', 'python tutorial'])
+def test_filler_is_dropped(text):
+    assert topic(text) == 'python'
+
+
+def test_a_topic_made_only_of_filler_is_kept():
+    assert topic('Learning') == 'learning'
+
+
+def test_difficulty_and_timeline_are_part_of_the_key():
+    assert normalize_plan_request('Go', 'Expert', '6') == ('go', 'advanced', 6)
+    assert plan_cache_key('go', 'advanced', 6) != plan_cache_key('go', 'advanced', 3)
+
+
+def test_two_tier_cache_survives_a_new_process(tmp_path):
+    path = str(tmp_path / 'plans.sqlite3')
+    key = plan_cache_key('ML', 'beginner', 3)
+    PlanCache(path=path).set(key, {'plan_title': 'ML'})
+
+    fresh = PlanCache(path=path)
+    assert fresh.get(key) == {'plan_title': 'ML'}
+    assert fresh.get(key) == {'plan_title': 'ML'}
+    assert fresh.get('missing') is None
+    assert fresh.stats()['disk_hits'] == 1 and fresh.stats()['memory_hits'] == 1 and fresh.stats()['misses'] == 1
+
+
+def _disk_keys(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT key FROM plan_cache")}
+    finally:
+        conn.close()
+
+
+def test_expired_rows_are_pruned_on_open_and_on_write(tmp_path, monkeypatch):
+    path = str(tmp_path / 'plans.sqlite3')
+    clock = [1000.0]
+    monkeypatch.setattr(plan_cache, 'time', SimpleNamespace(time=lambda: clock[0]))
+
+    cache = PlanCache(path=path, ttl_seconds=60)
+    cache.set('old', {'plan_title': 'Old'})
+    clock[0] += 30
+    cache.set('newer', {'plan_title': 'Newer'})
+    clock[0] += 40
+    cache.set('newest', {'plan_title': 'Newest'})
+    assert _disk_keys(path) == {'newer', 'newest'}
+
+    clock[0] += 40
+    PlanCache(path=path, ttl_seconds=60).get('newest')
+    assert _disk_keys(path) == {'newest'}
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+import types
+
+import pytest
+
+from backend.services import plan_generator
+from backend.services.plan_generator import PlanGenerationError, allocate_lessons, generate_plan_fanout
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(plan_generator, 'time', types.SimpleNamespace(sleep=lambda seconds: None))
+
+
+def outline(count):
+    return json.dumps({
+        'plan_title': 'Go',
+        'modules': [{'module_number': 9 - i, 'module_title': f'M{i}'} for i in range(count)],
+    })
+
+
+def lessons(prompt):
+    count = int(prompt.split('Exactly ')[1].split(' ')[0])
+    return json.dumps({'lessons': [{'topic': f't{i}', 'day_of_plan': 99} for i in range(count)]})
+
+
+def test_allocate_lessons():
+    assert allocate_lessons(20, 3) == [7, 7, 6]
+    assert sum(allocate_lessons(40, 6)) == 40
+
+
+def test_fanout_stitches_modules_in_order():
+    def generate_text(prompt):
+        return outline(3) if 'Design the module outline' in prompt else lessons(prompt)
+
+    plan = generate_plan_fanout('Go', 'beginner', 1, generate_text)
+    assert plan['plan_title'] == 'Go'
+    assert [m['module_number'] for m in plan['modules']] == [1, 2, 3]
+    days = [lesson['day_of_plan'] for m in plan['modules'] for lesson in m['lessons']]
+    assert days == list(range(1, 21))
+
+
+def test_fanout_publishes_each_module_in_order():
+    def generate_text(prompt):
+        if 'Design the module outline' in prompt:
+            return outline(3)
+        # Later modules finish first; progress must still arrive in module order.
+        if 'Write module 1:' in prompt:
+            time.sleep(0.05)
+        return lessons(prompt)
+
+    published = []
+    plan = generate_plan_fanout('Go', 'beginner', 1, generate_text, published.append)
+    assert [len(p['modules']) for p in published] == [0, 1, 2, 3]
+    assert all(p['plan_title'] == 'Go' for p in published)
+    assert [m['module_number'] for m in published[2]['modules']] == [1, 2]
+    assert published[-1]['modules'] == plan['modules']
+
+
+def test_malformed_responses_are_re_asked():
+    answers = iter(['not json', '{"modules": []}', outline(1)])
+    calls = []
+
+    def generate_text(prompt):
+        calls.append(prompt)
+        return next(answers) if 'Design the module outline' in prompt else lessons(prompt)
+
+    plan = generate_plan_fanout('Go', 'beginner', 1, generate_text)
+    assert len(plan['modules']) == 1
+    assert len(calls) == 4
+
+
+def test_api_errors_are_not_retried_again():
+    calls = []
+
+    def generate_text(prompt):
+        calls.append(prompt)
+        raise ConnectionError('gateway gave up')
+
+    with pytest.raises(ConnectionError):
+        generate_plan_fanout('Go', 'beginner', 1, generate_text)
+    assert len(calls) == 1
+
+
+def test_failed_module_cancels_the_others(monkeypatch):
+    monkeypatch.setattr(plan_generator, 'PLAN_MODULE_RETRIES', 5)
+    release = threading.Event()
+    module_calls = []
+
+    def generate_text(prompt):
+        if 'Design the module outline' in prompt:
+            return outline(4)
+        module_calls.append(prompt)
+        if 'Write module 1:' in prompt:
+            raise ConnectionError('module 1 failed')
+        release.wait(2)
+        return 'still not json'
+
+    with pytest.raises(ConnectionError):
+        generate_plan_fanout('Go', 'beginner', 1, generate_text)
+    release.set()
+    time.sleep(0.1)
+
+    # Modules 2-4 are either cancelled before starting or stop after their
+    # in-flight attempt, instead of making PLAN_MODULE_RETRIES + 1 = 6 calls each.
+    assert 1 <= len(module_calls) <= 4
+
+
+def test_exhausted_retries_raise_plan_generation_error():
+    with pytest.raises(PlanGenerationError):
+        generate_plan_fanout('Go', 'beginner', 1, lambda prompt: 'never json')
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from backend.services.prefetch import Prefetcher
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def blocked_prefetcher(**kwargs):
+    """A one-worker prefetcher whose worker is parked on a task from user 'x' until release is set."""
+    prefetcher = Prefetcher(max_workers=1, **kwargs)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(2)
+
+    assert prefetcher.schedule('x', 'block', block)
+    assert started.wait(2)
+    return prefetcher, release
+
+
+def test_runs_scheduled_task():
+    prefetcher, done = Prefetcher(max_workers=1), threading.Event()
+    assert prefetcher.schedule('u', 'k', done.set)
+    assert done.wait(2)
+    assert wait_until(lambda: prefetcher.pending() == 0)
+
+
+def test_duplicate_keys_are_dropped_while_outstanding():
+    prefetcher, release = blocked_prefetcher(per_user_limit=10, global_budget=10)
+    assert prefetcher.schedule('u', 'k', lambda: None)
+    assert not prefetcher.schedule('u', 'k', lambda: None)
+    assert not prefetcher.schedule('v', 'k', lambda: None)
+    assert prefetcher.dropped == 0  # duplicates aren't budget drops
+    release.set()
+    assert wait_until(lambda: prefetcher.pending() == 0)
+    # Once finished, the key can be scheduled again.
+    assert prefetcher.schedule('u', 'k', lambda: None)
+
+
+def test_per_user_limit():
+    prefetcher, release = blocked_prefetcher(per_user_limit=2, global_budget=10)
+    assert prefetcher.schedule('u', 'a', lambda: None)
+    assert prefetcher.schedule('u', 'b', lambda: None)
+    assert not prefetcher.schedule('u', 'c', lambda: None)
+    assert prefetcher.schedule('v', 'd', lambda: None)
+    assert prefetcher.dropped == 1
+    release.set()
+
+
+def test_global_budget_counts_running_tasks():
+    prefetcher, release = blocked_prefetcher(per_user_limit=10, global_budget=3)
+    assert prefetcher.schedule('u', 'a', lambda: None)
+    assert prefetcher.schedule('v', 'b', lambda: None)
+    assert not prefetcher.schedule('w', 'c', lambda: None)
+    assert prefetcher.pending() == 3
+    release.set()
+    assert wait_until(lambda: prefetcher.pending() == 0)
+    assert prefetcher.schedule('w', 'c', lambda: None)
+
+
+def test_users_are_served_round_robin():
+    prefetcher, release = blocked_prefetcher(per_user_limit=10, global_budget=10)
+    order = []
+    for key in ('a1', 'a2', 'a3'):
+        prefetcher.schedule('a', key, order.append, key)
+    prefetcher.schedule('b', 'b1', order.append, 'b1')
+    prefetcher.schedule('c', 'c1', order.append, 'c1')
+    release.set()
+    assert wait_until(lambda: prefetcher.pending() == 0)
+    assert order == ['a1', 'b1', 'c1', 'a2', 'a3']
+
+
+def test_failing_task_releases_its_budget():
+    prefetcher = Prefetcher(max_workers=1, per_user_limit=1, global_budget=1)
+
+    def fail():
+        raise RuntimeError('transcript fetch failed')
+
+    assert prefetcher.schedule('u', 'k', fail)
+    assert wait_until(lambda: prefetcher.pending() == 0)
+    assert prefetcher.schedule('u', 'k2', lambda: None)
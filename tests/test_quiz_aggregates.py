@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip('firebase_admin')
+
+from backend.services import quiz_aggregates
+from backend.services.popularity import title_key
+from backend.services.quiz_aggregates import (
+    _points_from_attempts, _qualifies, _window_points, fold_attempt, period_key, stats_summary
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('when, weekly, monthly', [
+    (utc(2026, 10, 18), '2026-W42', '2026-10'),
+    # ISO weeks: Jan 1st 2027 is a Friday, so it's still in 2026's last week.
+    (utc(2027, 1, 1), '2026-W53', '2027-01'),
+    (utc(2024, 12, 30), '2025-W01', '2024-12'),
+    (utc(2026, 3, 2, 0, 0, 1), '2026-W10', '2026-03'),
+])
+def test_period_keys(when, weekly, monthly):
+    assert period_key('weekly', when) == weekly
+    assert period_key('monthly', when) == monthly
+    assert period_key('all_time', when) == 'all'
+
+
+def test_points_from_an_old_period_count_as_zero():
+    stats = {'points': {'weekly': {'period': '2026-W41', 'score': 30}, 'all_time': {'period': 'all', 'score': 90}}}
+    assert _window_points(stats, 'weekly', '2026-W42') == 0
+    assert _window_points(stats, 'weekly', '2026-W41') == 30
+    assert _window_points(stats, 'all_time', 'all') == 90
+    assert _window_points({}, 'monthly', '2026-10') == 0
+
+
+def test_points_from_attempts_only_count_the_current_periods():
+    periods = {'all_time': 'all', 'weekly': '2026-W42', 'monthly': '2026-10'}
+    attempts = [
+        {'score': 5, 'submitted_at': utc(2026, 10, 13)},   # this week
+        {'score': 3, 'submitted_at': utc(2026, 10, 11)},   # last week, this month
+        {'score': 2, 'submitted_at': utc(2026, 9, 30)},    # last month
+        {'score': None, 'submitted_at': utc(2026, 10, 14)},
+        {'score': 4},                                     # no timestamp: all-time only
+    ]
+    assert _points_from_attempts(attempts, periods) == {'all_time': 14, 'weekly': 5, 'monthly': 8}
+
+
+def board(*scores):
+    return [{'userId': f'u{i}', 'name': f'User {i}', 'score': score} for i, score in enumerate(scores)]
+
+
+def test_anyone_qualifies_for_a_board_with_room(monkeypatch):
+    monkeypatch.setattr(quiz_aggregates, 'LEADERBOARD_SIZE', 3)
+    assert _qualifies(board(50, 40), 'new', 0)
+
+
+def test_full_board_needs_a_score_above_the_last_entry(monkeypatch):
+    monkeypatch.setattr(quiz_aggregates, 'LEADERBOARD_SIZE', 3)
+    entries = board(50, 40, 30)
+    assert _qualifies(entries, 'new', 31)
+    assert not _qualifies(entries, 'new', 30)
+    assert not _qualifies(entries, 'new', 5)
+
+
+def test_users_already_on_a_full_board_always_qualify(monkeypatch):
+    monkeypatch.setattr(quiz_aggregates, 'LEADERBOARD_SIZE', 3)
+    assert _qualifies(board(50, 40, 30), 'u2', 30)
+
+
+def test_fold_attempt_from_empty_stats():
+    stats = fold_attempt({}, 3, 4, 'lesson-1', 'Graphs')
+    assert stats == {
+        'total_taken': 1,
+        'score_sum': 75,
+        'highest_score': 75,
+        'last_lesson_id': 'lesson-1',
+        'last_topic': 'Graphs',
+        'topics': {title_key('Graphs'): {'topic': 'Graphs', 'count': 1, 'score_sum': 75, 'highest_score': 75}}
+    }
+
+
+def test_fold_attempt_accumulates_per_topic():
+    stats = fold_attempt({}, 4, 4, 'l1', 'Graphs')
+    stats = fold_attempt(stats, 1, 4, 'l2', '  graphs ')
+    stats = fold_attempt(stats, 2, 4, 'l3', 'Trees')
+    assert (stats['total_taken'], stats['score_sum'], stats['highest_score']) == (3, 175, 100)
+    assert (stats['last_lesson_id'], stats['last_topic']) == ('l3', 'Trees')
+    graphs = stats['topics'][title_key('Graphs')]
+    # Topics match case- and whitespace-insensitively and keep the first spelling.
+    assert graphs == {'topic': 'Graphs', 'count': 2, 'score_sum': 125, 'highest_score': 100}
+    assert stats['topics'][title_key('Trees')]['count'] == 1
+
+
+def test_fold_attempt_does_not_mutate_its_input():
+    before = fold_attempt({}, 1, 2, 'l1', 'Graphs')
+    snapshot = {**before, 'topics': {k: dict(v) for k, v in before['topics'].items()}}
+    fold_attempt(before, 2, 2, 'l2', 'Graphs')
+    assert before == snapshot
+
+
+def test_fold_attempt_handles_missing_score_total_and_topic():
+    stats = fold_attempt({}, None, 0, None, None)
+    assert (stats['score_sum'], stats['highest_score']) == (0, 0)
+    assert stats['last_topic'] == 'Unknown Topic'
+    assert stats['topics'][title_key('Unknown Topic')]['count'] == 1
+
+
+def test_stats_summary():
+    assert stats_summary({}) == {'total_taken': 0, 'average_score': 0, 'highest_score': 0, 'last_attempt': 'N/A'}
+    stats = fold_attempt(fold_attempt({}, 1, 2, 'l1', 'Graphs'), 2, 3, 'l2', 'Trees')
+    assert stats_summary(stats) == {'total_taken': 2, 'average_score': 58, 'highest_score': 67, 'last_attempt': 'Trees'}
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.singleflight import SingleFlight
+
+started, release = threading.Event(), threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def reset_events():
+    started.clear()
+    release.clear()
+
+
+def run_with_followers(group, key, fn, followers):
+    """Starts a leader, then `followers` callers once the leader is in flight; returns (results, errors)."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(group.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(2)
+    threads = [threading.Thread(target=call) for _ in range(followers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)  # let the followers block on the leader
+    assert group.in_flight(key)
+    release.set()
+    for thread in [leader, *threads]:
+        thread.join(2)
+    return results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    group, calls = SingleFlight(), []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return 'plan'
+
+    results, errors = run_with_followers(group, 'k', slow, followers=4)
+
+    assert calls == [1]
+    assert results == ['plan'] * 5 and not errors
+    assert not group.in_flight('k')
+
+
+def test_error_reaches_every_waiter_and_key_is_released():
+    group, calls = SingleFlight(), []
+
+    def failing():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        raise ValueError('LLM unavailable')
+
+    results, errors = run_with_followers(group, 'k', failing, followers=3)
+
+    assert calls == [1]
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    # A failed call isn't remembered: the next caller runs again.
+    assert group.do('k', lambda: 'retried') == 'retried'
+
+
+def test_sequential_calls_run_again():
+    group = SingleFlight()
+    calls = []
+    group.do('k', calls.append, 1)
+    group.do('k', calls.append, 2)
+    assert calls == [1, 2]
+
+
+def test_leader_sees_its_own_exception():
+    group = SingleFlight()
+    with pytest.raises(KeyError):
+        group.do('k', {}.__getitem__, 'missing')
+    assert not group.in_flight('k')
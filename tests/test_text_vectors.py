@@ -0,0 +1,45 @@
+import numpy as np
+
+from backend.services.text_vectors import HashingEmbedder
+
+
+def test_score_without_candidates_is_empty():
+    scores = HashingEmbedder().score('python', [])
+    assert scores.shape == (0,)
+
+
+def test_score_is_one_score_per_candidate_in_order():
+    candidates = ['Intro to Python', 'Cooking pasta', 'Python for data analysis']
+    scores = HashingEmbedder().score('python programming', candidates)
+    assert scores.shape == (3,)
+    assert scores[0] > scores[1] and scores[2] > scores[1]
+
+
+def test_identical_text_scores_highest():
+    candidates = ['Linear algebra basics', 'Web development with Flask', 'Guitar chords']
+    scores = HashingEmbedder().score('Web development with Flask', candidates)
+    assert int(np.argmax(scores)) == 1
+    assert scores[1] > 0.9
+
+
+def test_scores_are_cosines():
+    scores = HashingEmbedder().score('graph algorithms', ['graphs', 'sorting algorithms', ''])
+    assert np.all(scores >= 0.0) and np.all(scores <= 1.0 + 1e-6)
+    assert scores[2] == 0.0
+
+
+def test_shared_words_count_for_less_with_sif():
+    # "tutorial" is in every text, so SIF weighting discounts it.
+    query = 'python tutorial'
+    candidates = ['java tutorial', 'python basics tutorial']
+    with_sif = HashingEmbedder(char_weight=0).score(query, candidates)
+    without_sif = HashingEmbedder(sif=False, char_weight=0).score(query, candidates)
+    assert with_sif[1] > with_sif[0]
+    assert with_sif[0] < without_sif[0]
+
+
+def test_scores_are_stable_across_embedders():
+    candidates = ['machine learning', 'deep learning']
+    first = HashingEmbedder().score('neural networks', candidates)
+    second = HashingEmbedder().score('neural networks', candidates)
+    assert np.array_equal(first, second)
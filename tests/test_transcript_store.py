@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip('firebase_admin')
+pytest.importorskip('youtube_transcript_api')
+
+from backend.services.transcript_store import TranscriptReader, _compress_segments, _decompress_segments
+
+# Three chunks of 2-second segments: [0, 2, 4], [6, 8, 10], [12, 14].
+CHUNKS = [
+    [[0.0, 2.0, 'a'], [2.0, 2.0, 'b'], [4.0, 2.0, 'c']],
+    [[6.0, 2.0, 'd'], [8.0, 2.0, 'e'], [10.0, 2.0, 'f']],
+    [[12.0, 2.0, 'g'], [14.0, 2.0, 'h']],
+]
+
+
+class FakeReader(TranscriptReader):
+    """Serves chunks from memory and records which ones were read."""
+
+    def __init__(self):
+        super().__init__('video', {'chunk_starts': [0.0, 6.0, 12.0], 'duration': 16.0})
+        self.read = []
+
+    def _chunk(self, index):
+        self.read.append(index)
+        return CHUNKS[index]
+
+
+def texts(start=None, end=None):
+    return ''.join(FakeReader().iter_text(start, end))
+
+
+def test_whole_transcript_in_order():
+    assert texts() == 'abcdefgh'
+
+
+def test_start_on_a_chunk_boundary_skips_the_previous_chunk():
+    reader = FakeReader()
+    assert ''.join(reader.iter_text(6.0)) == 'defgh'
+    assert reader.read == [1, 2]
+
+
+def test_start_inside_a_segment_includes_it():
+    assert texts(5.0) == 'cdefgh'
+
+
+def test_end_on_a_chunk_boundary_excludes_the_next_chunk():
+    reader = FakeReader()
+    assert ''.join(reader.iter_text(None, 12.0)) == 'abcdef'
+    assert reader.read == [0, 1]
+
+
+def test_range_inside_one_chunk_reads_only_that_chunk():
+    reader = FakeReader()
+    assert ''.join(reader.iter_text(8.5, 10.0)) == 'e'
+    assert reader.read == [1]
+
+
+def test_range_spanning_chunks():
+    assert texts(3.0, 13.0) == 'bcdefg'
+
+
+def test_ranges_outside_the_transcript_are_empty():
+    assert texts(16.0) == ''
+    assert texts(None, 0.0) == ''
+
+
+def test_empty_transcript():
+    reader = TranscriptReader('video', {'chunk_starts': []})
+    assert list(reader.iter_segments()) == []
+    assert list(reader.iter_segments(1.0, 2.0)) == []
+
+
+def test_compressed_chunks_round_trip():
+    segments = [{'start': 1.234, 'duration': 2.0, 'text': 'héllo'}, {'start': 3.5, 'text': 'x'}]
+    assert _decompress_segments(_compress_segments(segments)) == [[1.23, 2.0, 'héllo'], [3.5, 0.0, 'x']]